@@ -1,12 +1,32 @@
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 from datetime import datetime, timedelta
+import importlib
+import inspect
 
-# Import fungsi-fungsi ETL dari modul yang terpisah
-# Pastikan folder 'data' di-upload bersama DAG ke Composer
-from data.extraction import extract_api_data_to_gcs
-from data.transformation_db import create_operational_db_schema, transform_and_load_to_operational_db
-from data.transformation_dw import create_bigquery_tables_for_data_mart, transform_and_load_to_bigquery_data_mart
+# Fungsi-fungsi ETL ada di modul terpisah (folder 'data', pastikan di-upload bersama DAG ke Composer).
+# Modul tersebut TIDAK diimpor saat scheduler mem-parsing file ini (pandas, tweepy, sqlalchemy,
+# google-cloud-* berat untuk diimpor); callable baru di-resolve saat task dijalankan.
+def lazy_callable(path: str):
+    """Membuat callable PythonOperator yang mengimpor 'modul:fungsi' saat task dieksekusi.
+    Hanya variabel context Airflow yang tidak diminta fungsi target yang dibuang; op_kwargs diteruskan
+    apa adanya, sehingga op_kwargs yang salah ketik tetap gagal dengan TypeError."""
+    module_name, func_name = path.split(":")
+
+    def _call(*args, **kwargs):
+        from airflow.utils.context import KNOWN_CONTEXT_KEYS
+        func = getattr(importlib.import_module(module_name), func_name)
+        params = inspect.signature(func).parameters
+        if not any(p.kind == inspect.Parameter.VAR_KEYWORD for p in params.values()):
+            kwargs = {
+                key: value for key, value in kwargs.items()
+                if key in params or key not in KNOWN_CONTEXT_KEYS
+            }
+        return func(*args, **kwargs)
+
+    _call.__name__ = func_name
+    _call.__qualname__ = func_name
+    return _call
 
 
 with DAG(
@@ -15,6 +35,9 @@ with DAG(
     schedule_interval=timedelta(days=1), # Jalankan setiap hari
     catchup=False, # Penting: Jangan jalankan untuk tanggal-tanggal yang terlewat
     tags=['etl', 'tourism', 'finance', 'daily'],
+    # Profiling opt-in: isi dengan daftar task_id (atau "all") saat trigger DAG, misal
+    # {"profile_tasks": ["transform_load_to_bigquery_data_mart"]}
+    params={'profile_tasks': []},
     default_args={
         'owner': 'airflow',
         'depends_on_past': False,
@@ -28,16 +51,22 @@ with DAG(
     # --- Task Ekstraksi Data API ke GCS Staging Area ---
     extract_api_data = PythonOperator(
         task_id='extract_api_data_to_gcs_staging',
-        python_callable=extract_api_data_to_gcs,
+        python_callable=lazy_callable('data.extraction:extract_api_data_to_gcs'),
         op_kwargs={'query_lokasi_wisata': 'objek wisata populer di Malang'}
     )
 
     # --- Catatan: Data manual (keuangan) sudah diunggah ke GCS oleh proses terpisah (dengan skrip manual_finance_uploader pada folder manual_tools).
+    # --- Task Notifikasi Ekspektasi Upload Manual ---
+    # Mencatat jumlah file keuangan manual di staging GCS dan memberi peringatan jika belum ada upload hari ini.
+    notify_manual_upload_expectation = PythonOperator(
+        task_id='notify_manual_upload_expectation',
+        python_callable=lazy_callable('data.extraction:notify_manual_upload_expectation'),
+    )
 
     # --- Task Pembentukan Skema Database Operasional ---
     create_operational_db_schema_task = PythonOperator(
         task_id='create_operational_db_schema',
-        python_callable=create_operational_db_schema,
+        python_callable=lazy_callable('data.transformation_db:create_operational_db_schema'),
     )
 
     # --- Task Transformasi & Loading ke Database Operasional ---
@@ -45,19 +74,49 @@ with DAG(
     # serta menangani duplikat sebelum memasukkan ke DB operasional.
     transform_load_operational_db = PythonOperator(
         task_id='transform_load_to_operational_db',
-        python_callable=transform_and_load_to_operational_db,
+        python_callable=lazy_callable('data.transformation_db:transform_and_load_to_operational_db'),
     )
 
     # --- Task Pembentukan Tabel BigQuery Data Mart ---
     create_bigquery_tables = PythonOperator(
         task_id='create_bigquery_tables_data_mart',
-        python_callable=create_bigquery_tables_for_data_mart,
+        python_callable=lazy_callable('data.transformation_dw:create_bigquery_tables_for_data_mart'),
     )
 
     # --- Task Transformasi & Loading ke BigQuery Data Mart ---
     transform_load_bigquery_data_mart = PythonOperator(
         task_id='transform_load_to_bigquery_data_mart',
-        python_callable=transform_and_load_to_bigquery_data_mart,
+        python_callable=lazy_callable('data.transformation_dw:transform_and_load_to_bigquery_data_mart'),
+    )
+
+    # --- Task Enrichment Teks Review & Tweet (normalisasi, kata kunci, sentimen) ---
+    enrich_text = PythonOperator(
+        task_id='enrich_text_for_data_mart',
+        python_callable=lazy_callable('data.text_enrichment:enrich_text_for_data_mart'),
+    )
+
+    # --- Task Pembaruan Agregat Dashboard (inkremental per hari/bulan yang masih pending) ---
+    refresh_aggregates = PythonOperator(
+        task_id='refresh_data_mart_aggregates',
+        python_callable=lazy_callable('data.aggregation:refresh_data_mart_aggregates'),
+    )
+
+    # --- Task Ringkasan Metrik ETL (durasi, baris, byte, API call per tahap) ---
+    # Tetap dijalankan walau ada task yang gagal agar run lambat/gagal tetap terlihat.
+    summarize_metrics = PythonOperator(
+        task_id='summarize_etl_run_metrics',
+        python_callable=lazy_callable('data.instrumentation:summarize_etl_run_metrics'),
+        op_kwargs={'task_ids': [
+            'extract_api_data_to_gcs_staging',
+            'notify_manual_upload_expectation',
+            'create_operational_db_schema',
+            'transform_load_to_operational_db',
+            'create_bigquery_tables_data_mart',
+            'transform_load_to_bigquery_data_mart',
+            'refresh_data_mart_aggregates',
+            'enrich_text_for_data_mart',
+        ]},
+        trigger_rule='all_done',
     )
 
     # --- Definisi Urutan (Dependensi) Tugas ---
@@ -70,3 +129,9 @@ with DAG(
 
     # Setelah data di DB operasional, buat skema BigQuery dan kemudian muat data ke BigQuery.
     transform_load_operational_db >> create_bigquery_tables >> transform_load_bigquery_data_mart
+
+    # Agregat dashboard diperbarui setelah tabel fakta dimuat, lalu ringkasan metrik di akhir run DAG.
+    transform_load_bigquery_data_mart >> refresh_aggregates >> summarize_metrics
+
+    # Enrichment teks hanya butuh DB operasional dan tabel BigQuery; berjalan paralel dengan load data mart.
+    create_bigquery_tables >> enrich_text >> summarize_metrics
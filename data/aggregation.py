@@ -0,0 +1,180 @@
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from data.config import BIGQUERY_PROJECT_ID, BIGQUERY_DATASET_ID, SQL_ALCHEMY_DATABASE_URL
+from data.instrumentation import instrumented, stage, count
+from data.profiling import profiled
+
+DATASET = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}"
+
+# Tabel di database operasional berisi periode agregat yang menunggu refresh. Baris dicatat
+# bersamaan dengan load record baru dan baru dihapus setelah refresh agregatnya berhasil,
+# sehingga periode dari run yang gagal tetap di-refresh pada run berikutnya.
+PENDING_PERIODS_TABLE = "aggregate_pending_periods"
+
+# Definisi agregat dashboard. Setiap agregat diperbarui per periode (hari/bulan):
+# baris periode yang tersentuh load terakhir dihapus lalu dihitung ulang dari tabel fakta.
+# - sources: tabel operasional yang tanggal record barunya menentukan periode yang di-refresh
+# - period : "day" atau "month"
+# - select : query agregasi; {where} diganti filter periode (atau kosong untuk refresh penuh)
+AGGREGATES = {
+    "agg_maps_harian": {
+        "sources": ["reviews"],
+        "period": "day",
+        "period_column": "tanggal",
+        "select": f"""
+            SELECT
+                DATE(timestamp_datetime) AS tanggal,
+                place_id,
+                COUNT(*) AS jumlah_review,
+                AVG(rating) AS rata_rata_rating
+            FROM `{DATASET}.fact_maps`
+            {{where}}
+            GROUP BY tanggal, place_id
+        """,
+        "period_expression": "DATE(timestamp_datetime)",
+    },
+    "agg_twitter_harian": {
+        "sources": ["tweets"],
+        "period": "day",
+        "period_column": "tanggal",
+        "select": f"""
+            SELECT
+                DATE(created_at_datetime) AS tanggal,
+                place_id,
+                ANY_VALUE(nama_lokasi) AS nama_lokasi,
+                COUNT(*) AS jumlah_tweet
+            FROM `{DATASET}.fact_twitter`
+            {{where}}
+            GROUP BY tanggal, place_id
+        """,
+        "period_expression": "DATE(created_at_datetime)",
+    },
+    "agg_keuangan_bulanan": {
+        "sources": ["pemasukan", "pengeluaran"],
+        "period": "month",
+        "period_column": "bulan",
+        "select": f"""
+            SELECT
+                DATE_TRUNC(DATE(t.timestamp_datetime), MONTH) AS bulan,
+                t.id_proyek,
+                p.sektor_pariwisata,
+                SUM(t.pemasukan) AS total_pemasukan,
+                SUM(t.pengeluaran) AS total_pengeluaran
+            FROM (
+                SELECT timestamp_datetime, id_proyek,
+                    jumlah_pemasukan AS pemasukan, CAST(0 AS BIGNUMERIC) AS pengeluaran
+                FROM `{DATASET}.fact_pemasukan`
+                UNION ALL
+                SELECT timestamp_datetime, id_proyek,
+                    CAST(0 AS BIGNUMERIC) AS pemasukan, jumlah_pengeluaran AS pengeluaran
+                FROM `{DATASET}.fact_pengeluaran`
+            ) AS t
+            LEFT JOIN `{DATASET}.dim_proyek` AS p USING (id_proyek)
+            {{where}}
+            GROUP BY bulan, t.id_proyek, p.sektor_pariwisata
+        """,
+        "period_expression": "DATE_TRUNC(DATE(t.timestamp_datetime), MONTH)",
+    },
+}
+
+
+def _period_of(spec: dict, day: date) -> date:
+    """Periode agregat (hari, atau awal bulan) untuk satu tanggal."""
+    return day.replace(day=1) if spec["period"] == "month" else day
+
+
+def record_pending_periods(connection, source_table: str, dates: list):
+    """Mencatat periode agregat yang tersentuh record baru di tabel operasional source_table.
+    Dipanggil dalam transaksi yang sama dengan insert record barunya."""
+    rows = {
+        (table_name, _period_of(spec, date.fromisoformat(tanggal)).isoformat())
+        for table_name, spec in AGGREGATES.items() if source_table in spec["sources"]
+        for tanggal in dates
+    }
+    if not rows:
+        return
+    df_existing = pd.read_sql_query(f"SELECT agg_table, period FROM {PENDING_PERIODS_TABLE}", connection)
+    existing = set(zip(df_existing["agg_table"], pd.to_datetime(df_existing["period"]).dt.strftime("%Y-%m-%d")))
+    df_new = pd.DataFrame(sorted(rows - existing), columns=["agg_table", "period"])
+    if not df_new.empty:
+        df_new.to_sql(PENDING_PERIODS_TABLE, connection, if_exists="append", index=False)
+
+
+def load_pending_periods(engine) -> dict:
+    """Periode yang menunggu refresh per agregat: {agg_table: [date, ...]}."""
+    df_pending = pd.read_sql_query(f"SELECT agg_table, period FROM {PENDING_PERIODS_TABLE}", engine)
+    df_pending["period"] = pd.to_datetime(df_pending["period"]).dt.date
+    return {
+        table_name: sorted(group["period"].unique())
+        for table_name, group in df_pending.groupby("agg_table")
+    }
+
+
+def clear_pending_periods(engine, table_name: str, periods: list = None):
+    """Menghapus periode yang sudah berhasil di-refresh (semua periode jika periods None)."""
+    with engine.begin() as connection:
+        if periods is None:
+            connection.execute(text(f"DELETE FROM {PENDING_PERIODS_TABLE} WHERE agg_table = :agg_table"),
+                               {"agg_table": table_name})
+            return
+        for period in periods:
+            connection.execute(
+                text(f"DELETE FROM {PENDING_PERIODS_TABLE} WHERE agg_table = :agg_table AND period = :period"),
+                {"agg_table": table_name, "period": period.isoformat()},
+            )
+
+
+def _refresh_script(table_name: str, spec: dict, full_refresh: bool) -> str:
+    """Skrip BigQuery untuk memperbarui satu agregat. Jika tabel agregat masih kosong
+    (baru dibuat), seluruh histori fakta diagregasi sekali."""
+    table_id = f"{DATASET}.{table_name}"
+    full_select = spec["select"].format(where="")
+    if full_refresh:
+        return f"""
+            TRUNCATE TABLE `{table_id}`;
+            INSERT INTO `{table_id}` {full_select};
+        """
+    incremental_select = spec["select"].format(where=f"WHERE {spec['period_expression']} IN UNNEST(@periods)")
+    return f"""
+        IF (SELECT COUNT(*) FROM `{table_id}`) = 0 THEN
+            INSERT INTO `{table_id}` {full_select};
+        ELSE
+            DELETE FROM `{table_id}` WHERE {spec['period_column']} IN UNNEST(@periods);
+            INSERT INTO `{table_id}` {incremental_select};
+        END IF;
+    """
+
+
+@instrumented("refresh_data_mart_aggregates")
+@profiled
+def refresh_data_mart_aggregates(full_refresh: bool = False):
+    """Memperbarui tabel agregat dashboard secara inkremental untuk hari/bulan yang tercatat di
+    tabel periode pending (database operasional). Periode dihapus dari tabel pending hanya setelah
+    refresh agregatnya berhasil. full_refresh=True menghitung ulang seluruh agregat."""
+    from google.cloud import bigquery
+    print("\n--- Memperbarui Agregat Data Mart BigQuery ---")
+    bigquery_client = bigquery.Client(project=BIGQUERY_PROJECT_ID)
+    engine = create_engine(SQL_ALCHEMY_DATABASE_URL)
+
+    pending = {} if full_refresh else load_pending_periods(engine)
+    if full_refresh:
+        print("Refresh penuh diminta, semua agregat dihitung ulang dari tabel fakta.")
+
+    for table_name, spec in AGGREGATES.items():
+        periods = pending.get(table_name, [])
+        if not full_refresh and not periods:
+            print(f"Tidak ada periode pending untuk {table_name}, dilewati.")
+            continue
+        with stage(f"refresh_{table_name}"):
+            job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ArrayQueryParameter("periods", "DATE", periods)
+            ])
+            query_job = bigquery_client.query(_refresh_script(table_name, spec, full_refresh), job_config=job_config)
+            query_job.result()
+            count(bytes=query_job.total_bytes_processed or 0)
+        clear_pending_periods(engine, table_name, None if full_refresh else periods)
+        scope = "penuh" if full_refresh else f"{len(periods)} periode"
+        print(f"Agregat {table_name} berhasil diperbarui ({scope}).")
@@ -0,0 +1,200 @@
+import io
+
+import pandas as pd
+
+# Skema eksplisit tabel data mart: (nama kolom, tipe BigQuery, mode).
+# Harus selalu sama dengan DDL di create_bigquery_tables_for_data_mart.
+DATA_MART_COLUMNS = {
+    "dim_waktu": [
+        ("id_waktu", "INT64", "REQUIRED"),
+        ("tanggal", "DATE", "REQUIRED"),
+        ("jam", "TIME", "REQUIRED"),
+        ("hari", "STRING", "REQUIRED"),
+        ("bulan", "STRING", "REQUIRED"),
+        ("tahun", "INT64", "REQUIRED"),
+    ],
+    "dim_place": [
+        ("place_id", "STRING", "REQUIRED"),
+        ("nama_tempat", "STRING", "REQUIRED"),
+        ("latitude", "FLOAT64", "REQUIRED"),
+        ("longitude", "FLOAT64", "REQUIRED"),
+        ("tipe_tempat", "STRING", "REQUIRED"),
+        ("kontak", "STRING", "NULLABLE"),
+        ("jam_operasional", "STRING", "NULLABLE"),
+    ],
+    "dim_user": [
+        ("id_user", "STRING", "REQUIRED"),
+        ("lokasi_user", "STRING", "NULLABLE"),
+    ],
+    "dim_vendor": [
+        ("id_vendor", "STRING", "REQUIRED"),
+        ("nama_vendor", "STRING", "REQUIRED"),
+    ],
+    "dim_departemen": [
+        ("id_departemen", "STRING", "REQUIRED"),
+        ("nama_departemen", "STRING", "REQUIRED"),
+    ],
+    "dim_proyek": [
+        ("id_proyek", "STRING", "REQUIRED"),
+        ("nama_proyek", "STRING", "REQUIRED"),
+        ("sektor_pariwisata", "STRING", "REQUIRED"),
+    ],
+    "dim_penyumbang": [
+        ("id_penyumbang", "STRING", "REQUIRED"),
+        ("nama_penyumbang", "STRING", "REQUIRED"),
+        ("jenis_penyumbang", "STRING", "REQUIRED"),
+    ],
+    "fact_maps": [
+        ("id_review", "STRING", "REQUIRED"),
+        ("timestamp_datetime", "TIMESTAMP", "REQUIRED"),
+        ("id_waktu", "INT64", "REQUIRED"),
+        ("place_id", "STRING", "REQUIRED"),
+        ("author_url", "STRING", "REQUIRED"),
+        ("review_longtext", "STRING", "REQUIRED"),
+        ("rating", "FLOAT64", "REQUIRED"),
+    ],
+    "fact_twitter": [
+        ("id_tweet", "STRING", "REQUIRED"),
+        ("created_at_datetime", "TIMESTAMP", "REQUIRED"),
+        ("id_waktu", "INT64", "REQUIRED"),
+        ("place_id", "STRING", "REQUIRED"),
+        ("id_user", "STRING", "REQUIRED"),
+        ("nama_lokasi", "STRING", "REQUIRED"),
+        ("text_tweet", "STRING", "REQUIRED"),
+        ("place_id_geo", "STRING", "NULLABLE"),
+        ("jarak_place_km", "FLOAT64", "NULLABLE"),
+    ],
+    "fact_pengeluaran": [
+        ("id_transaksi", "STRING", "REQUIRED"),
+        ("timestamp_datetime", "TIMESTAMP", "REQUIRED"),
+        ("id_waktu", "INT64", "REQUIRED"),
+        ("jenis_kebutuhan", "STRING", "REQUIRED"),
+        ("id_vendor", "STRING", "REQUIRED"),
+        ("id_departemen", "STRING", "REQUIRED"),
+        ("jumlah_pengeluaran", "BIGNUMERIC", "REQUIRED"),
+        ("bukti_pengeluaran", "STRING", "NULLABLE"),
+        ("id_proyek", "STRING", "REQUIRED"),
+    ],
+    "fact_pemasukan": [
+        ("id_transaksi_income", "STRING", "REQUIRED"),
+        ("timestamp_datetime", "TIMESTAMP", "REQUIRED"),
+        ("id_waktu", "INT64", "REQUIRED"),
+        ("jenis_pemasukan", "STRING", "REQUIRED"),
+        ("id_penyumbang", "STRING", "REQUIRED"),
+        ("jumlah_pemasukan", "BIGNUMERIC", "REQUIRED"),
+        ("bukti_pemasukan", "STRING", "NULLABLE"),
+        ("id_proyek", "STRING", "REQUIRED"),
+    ],
+    "agg_maps_harian": [
+        ("tanggal", "DATE", "REQUIRED"),
+        ("place_id", "STRING", "REQUIRED"),
+        ("jumlah_review", "INT64", "REQUIRED"),
+        ("rata_rata_rating", "FLOAT64", "REQUIRED"),
+    ],
+    "agg_twitter_harian": [
+        ("tanggal", "DATE", "REQUIRED"),
+        ("place_id", "STRING", "REQUIRED"),
+        ("nama_lokasi", "STRING", "REQUIRED"),
+        ("jumlah_tweet", "INT64", "REQUIRED"),
+    ],
+    "agg_keuangan_bulanan": [
+        ("bulan", "DATE", "REQUIRED"),
+        ("id_proyek", "STRING", "REQUIRED"),
+        ("sektor_pariwisata", "STRING", "NULLABLE"),
+        ("total_pemasukan", "BIGNUMERIC", "REQUIRED"),
+        ("total_pengeluaran", "BIGNUMERIC", "REQUIRED"),
+    ],
+    "enrich_maps": [
+        ("id_review", "STRING", "REQUIRED"),
+        ("teks_normal", "STRING", "NULLABLE"),
+        ("kata_kunci", "STRING", "NULLABLE"),
+        ("skor_sentimen", "FLOAT64", "NULLABLE"),
+    ],
+    "enrich_twitter": [
+        ("id_tweet", "STRING", "REQUIRED"),
+        ("teks_normal", "STRING", "NULLABLE"),
+        ("kata_kunci", "STRING", "NULLABLE"),
+        ("skor_sentimen", "FLOAT64", "NULLABLE"),
+    ],
+    "quarantine": [
+        ("tabel", "STRING", "REQUIRED"),
+        ("alasan", "STRING", "REQUIRED"),
+        ("record", "STRING", "REQUIRED"),
+        ("rejected_at", "TIMESTAMP", "REQUIRED"),
+    ],
+}
+# Tabel staging karantina (dibuat oleh load job WRITE_TRUNCATE, lalu di-MERGE ke quarantine)
+DATA_MART_COLUMNS["quarantine_staging"] = DATA_MART_COLUMNS["quarantine"]
+
+PARQUET_COMPRESSION = "zstd"
+
+
+def _arrow_type(field_type: str):
+    """Tipe Arrow untuk tipe BigQuery. Nilai BIGNUMERIC ditulis sebagai DECIMAL(38, 9) di Parquet lalu
+    dikonversi BigQuery lewat decimal_target_types; nominal transaksi (bilangan bulat) muat tanpa
+    kehilangan presisi."""
+    import pyarrow as pa
+    return {
+        "STRING": pa.string(),
+        "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+        "TIME": pa.time64("us"),
+        "DATE": pa.date32(),
+        "INT64": pa.int64(),
+        "FLOAT64": pa.float64(),
+        "BIGNUMERIC": pa.decimal128(38, 9),
+    }[field_type]
+
+
+def bigquery_schema(table_name: str) -> list:
+    """Daftar SchemaField BigQuery untuk tabel data mart."""
+    from google.cloud import bigquery
+    return [
+        bigquery.SchemaField(name, field_type, mode=mode)
+        for name, field_type, mode in DATA_MART_COLUMNS[table_name]
+    ]
+
+
+def arrow_schema(table_name: str):
+    """Skema Arrow (pa.Schema) yang setara dengan DDL tabel data mart."""
+    import pyarrow as pa
+    return pa.schema([
+        pa.field(name, _arrow_type(field_type), nullable=(mode != "REQUIRED"))
+        for name, field_type, mode in DATA_MART_COLUMNS[table_name]
+    ])
+
+
+def df_to_arrow_table(df: pd.DataFrame, table_name: str):
+    """Mengonversi DataFrame ke Arrow Table per kolom dengan skema eksplisit, tanpa inferensi tipe
+    (kategori didekode, string Arrow dipakai langsung, timestamp dipotong ke mikrodetik)."""
+    import pyarrow as pa
+    schema = arrow_schema(table_name)
+    arrays = []
+    for field in schema:
+        array = pa.array(df[field.name], from_pandas=True)
+        if pa.types.is_dictionary(array.type):
+            array = array.dictionary_decode()
+        # Cast tidak aman hanya untuk memotong timestamp ns -> us; cast lain (misal float -> int,
+        # overflow desimal) tetap aman agar nilai yang terpotong/meluap menimbulkan error
+        arrays.append(array.cast(field.type, safe=not pa.types.is_timestamp(field.type)))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def df_to_parquet_buffer(df: pd.DataFrame, table_name: str) -> io.BytesIO:
+    """Menulis DataFrame sebagai Parquet terkompresi di memori, siap dipakai load_table_from_file."""
+    import pyarrow.parquet as pq
+    buffer = io.BytesIO()
+    pq.write_table(df_to_arrow_table(df, table_name), buffer, compression=PARQUET_COMPRESSION)
+    buffer.seek(0)
+    return buffer
+
+
+def parquet_load_job_config(table_name: str, write_disposition: str):
+    """Konfigurasi load job Parquet (bigquery.LoadJobConfig) dengan skema eksplisit,
+    sehingga BigQuery tidak perlu inferensi tipe."""
+    from google.cloud import bigquery
+    return bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
+        schema=bigquery_schema(table_name),
+        write_disposition=write_disposition,
+        decimal_target_types=["BIGNUMERIC"],
+    )
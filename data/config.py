@@ -24,3 +24,22 @@ BIGQUERY_DATASET_ID = "your_data_warehouse_dataset" # GANTI DENGAN ID DATASET Bi
 # SQL_ALCHEMY_DATABASE_URL = "mysql+pymysql://user:password@/instance_connection_name/database"
 OPERATIONAL_DB_PATH = 'operational_data.db' # Path untuk SQLite DB
 SQL_ALCHEMY_DATABASE_URL = f'sqlite:///{OPERATIONAL_DB_PATH}'
+
+# --- Konfigurasi Profiling (opt-in) ---
+# Daftar nama callable/task_id yang diprofiling, dipisah koma ("all" untuk semua task).
+# Bisa juga diaktifkan per run lewat DAG param 'profile_tasks'.
+ETL_PROFILE_TASKS = os.environ.get('ETL_PROFILE_TASKS', '')
+# Direktori lokal atau path GCS (gs://bucket/prefix) untuk laporan profiling
+ETL_PROFILE_OUTPUT_PATH = os.environ.get('ETL_PROFILE_OUTPUT_PATH', 'profiles')
+
+# --- Konfigurasi Dimensi Waktu ---
+# Tanggal awal kalender dim_waktu (grain tanggal + jam, UTC); diperluas otomatis bila ada data lebih lama.
+DIM_WAKTU_START_DATE = os.environ.get('DIM_WAKTU_START_DATE', '2024-01-01')
+
+# --- Konfigurasi Enrichment Teks ---
+TEXT_ENRICHMENT_WORKERS = int(os.environ.get('TEXT_ENRICHMENT_WORKERS', os.cpu_count() or 1))
+TEXT_ENRICHMENT_BATCH_SIZE = int(os.environ.get('TEXT_ENRICHMENT_BATCH_SIZE', 5000))
+
+# --- Konfigurasi Atribusi Spasial Tweet ---
+# Radius (km) maksimum dari tempat wisata agar tweet berkoordinat diatribusikan ke tempat tersebut
+TWEET_PLACE_RADIUS_KM = float(os.environ.get('TWEET_PLACE_RADIUS_KM', 2.0))
@@ -0,0 +1,55 @@
+import pandas as pd
+
+
+def _to_utc(value) -> pd.Timestamp:
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize("UTC") if timestamp.tzinfo is None else timestamp.tz_convert("UTC")
+
+
+def waktu_keys(timestamps: pd.Series) -> pd.Series:
+    """Surrogate key dim_waktu (grain tanggal + jam, UTC) dalam format integer YYYYMMDDHH.
+    Dihitung vektor dari kolom timestamp; nilai kosong menghasilkan <NA>."""
+    ts = pd.to_datetime(timestamps, utc=True)
+    keys = ts.dt.year * 1_000_000 + ts.dt.month * 10_000 + ts.dt.day * 100 + ts.dt.hour
+    return keys.astype("Int64")
+
+
+def build_calendar(start, end) -> pd.DataFrame:
+    """Membangun baris dim_waktu per jam (UTC) dari awal hari `start` sampai akhir hari `end`."""
+    start_day = _to_utc(start).floor("D")
+    end_day = _to_utc(end).floor("D")
+    hours = pd.Series(pd.date_range(start_day, end_day + pd.Timedelta(hours=23), freq="h"))
+    if hours.empty:
+        return pd.DataFrame(columns=["id_waktu", "tanggal", "jam", "hari", "bulan", "tahun"])
+    return pd.DataFrame({
+        "id_waktu": waktu_keys(hours),
+        "tanggal": hours.dt.date,
+        "jam": hours.dt.time,
+        "hari": hours.dt.day_name(),
+        "bulan": hours.dt.strftime("%Y-%m"),
+        "tahun": hours.dt.year,
+    })
+
+
+def key_to_timestamp(key: int) -> pd.Timestamp:
+    """Mengubah id_waktu (YYYYMMDDHH) kembali ke timestamp UTC awal jam tersebut."""
+    return pd.Timestamp(year=key // 1_000_000, month=key // 10_000 % 100, day=key // 100 % 100,
+                        hour=key % 100, tz="UTC")
+
+
+def missing_calendar_ranges(existing_min_key, existing_max_key, required_start, required_end) -> list:
+    """Rentang tanggal (start, end) yang belum ada di dim_waktu agar [required_start, required_end]
+    tercakup. Jika dim_waktu kosong, seluruh rentang dikembalikan."""
+    required_start = _to_utc(required_start)
+    required_end = _to_utc(required_end)
+    if existing_min_key is None or existing_max_key is None:
+        return [(required_start, required_end)]
+
+    ranges = []
+    existing_start = key_to_timestamp(existing_min_key).floor("D")
+    existing_end = key_to_timestamp(existing_max_key).floor("D")
+    if required_start.floor("D") < existing_start:
+        ranges.append((required_start, existing_start - pd.Timedelta(days=1)))
+    if required_end.floor("D") > existing_end:
+        ranges.append((existing_end + pd.Timedelta(days=1), required_end))
+    return ranges
@@ -0,0 +1,107 @@
+import pandas as pd
+
+# Rencana dtype per entitas (nama tabel operasional).
+# - "category"  : kolom berulang dengan kardinalitas rendah (disimpan sekali per nilai unik)
+# - "string"    : teks bebas/ID, disimpan sebagai string berbasis Arrow (bukan objek Python per baris)
+# - "float32"   : angka kecil presisi rendah (rating)
+# - "float64"   : koordinat (butuh presisi penuh)
+# - "int"       : bilangan bulat, di-downcast ke tipe terkecil yang muat
+# - "timestamp" : diparsing ke datetime UTC
+DTYPE_PLANS = {
+    "places": {
+        "place_id": "string",
+        "name": "string",
+        "phone_number": "string",
+        "opening_hours_text": "string",
+        "types": "category",
+        "lat": "float64",
+        "lng": "float64",
+        "rating_search": "float32",
+    },
+    "reviews": {
+        "id_review": "string",
+        "timestamp_review": "timestamp",
+        "place_id": "category",
+        "author_url": "string",
+        "review_text": "string",
+        "rating": "float32",
+    },
+    "tweets": {
+        "id_tweet": "string",
+        "place_id_source": "category",
+        "keyword_search": "category",
+        "created_at_tweet": "timestamp",
+        "text_tweet": "string",
+        "id_author_twitter": "string",
+        "author_location": "string",
+        "tweet_geo_place_id": "category",
+        "tweet_lat": "float64",
+        "tweet_lng": "float64",
+    },
+    "pemasukan": {
+        "id_transaksi_original": "string",
+        "timestamp": "timestamp",
+        "id_proyek": "category",
+        "nama_proyek": "category",
+        "sektor_pariwisata": "category",
+        "id_penyumbang": "string",
+        "nama_penyumbang": "string",
+        "jenis_penyumbang": "category",
+        "jenis_pemasukan": "category",
+        "jumlah": "int",
+        "bukti": "string",
+    },
+    "pengeluaran": {
+        "id_transaksi_original": "string",
+        "timestamp": "timestamp",
+        "id_proyek": "category",
+        "nama_proyek": "category",
+        "sektor_pariwisata": "category",
+        "id_vendor": "category",
+        "nama_vendor": "category",
+        "id_departemen": "category",
+        "nama_departemen": "category",
+        "jenis_kebutuhan": "category",
+        "jumlah": "int",
+        "bukti": "string",
+    },
+}
+
+ARROW_STRING_DTYPE = "string[pyarrow]"
+
+
+def _convert_column(series: pd.Series, kind: str) -> pd.Series:
+    if kind == "category":
+        return series.astype(ARROW_STRING_DTYPE).astype("category")
+    if kind == "string":
+        return series.astype(ARROW_STRING_DTYPE)
+    if kind in ("float32", "float64"):
+        return pd.to_numeric(series, errors="coerce").astype(kind)
+    if kind == "int":
+        numeric = pd.to_numeric(series, errors="coerce")
+        if numeric.isna().any():
+            return numeric.astype("Int64")
+        return pd.to_numeric(numeric, downcast="integer")
+    if kind == "timestamp":
+        return pd.to_datetime(series, utc=True, errors="coerce", format="ISO8601")
+    raise ValueError(f"Jenis dtype tidak dikenal: {kind}")
+
+
+def apply_dtype_plan(df: pd.DataFrame, entity: str) -> pd.DataFrame:
+    """Menerapkan rencana dtype entitas ke kolom yang ada di DataFrame (kolom lain dibiarkan)."""
+    plan = DTYPE_PLANS.get(entity)
+    if df.empty or not plan:
+        return df
+    converted = {
+        col: _convert_column(df[col], kind)
+        for col, kind in plan.items()
+        if col in df.columns
+    }
+    return df.assign(**converted)
+
+
+def csv_read_dtypes(entity: str) -> dict:
+    """Dtype untuk pd.read_csv: kolom teks/ID dibaca langsung sebagai string agar ID numerik
+    (misal id_author_twitter) tidak rusak menjadi float saat ada nilai kosong."""
+    plan = DTYPE_PLANS.get(entity, {})
+    return {col: ARROW_STRING_DTYPE for col, kind in plan.items() if kind in ("string", "category")}
@@ -1,39 +1,35 @@
-import requests
-import tweepy
 import pandas as pd
 from datetime import datetime, timezone
-from google.cloud import storage
-import io
 
 from data.config import GOOGLE_API_KEY, TWITTER_BEARER_TOKEN, \
     GCS_BUCKET_NAME_API, GCS_BUCKET_NAME_MANUAL, \
     GCS_PLACES_PREFIX, GCS_REVIEWS_PREFIX, GCS_TWEETS_PREFIX, \
-    GCS_PEMASUKAN_PREFIX, GCS_PENGELUARAN_PREFIX
-from data.utils import save_df_to_gcs
+    GCS_PEMASUKAN_PREFIX, GCS_PENGELUARAN_PREFIX, TWEET_PLACE_RADIUS_KM
+from data.spatial_index import haversine_km
+from data.utils import save_df_to_gcs, hash_review_key
+from data.instrumentation import instrumented, stage, count
+from data.profiling import profiled
 
 def get_places(query: str) -> list:
     """Mengambil daftar tempat dasar menggunakan Text Search API."""
+    import requests  # Diimpor saat dipakai, seperti tweepy: hanya task ekstraksi yang memanggil API HTTP
     url = f"https://maps.googleapis.com/maps/api/place/textsearch/json?query={query}&key={GOOGLE_API_KEY}&language=id"
     response = requests.get(url)
+    count(api_calls=1, bytes=len(response.content))
     response.raise_for_status()
     return response.json().get("results", [])
 
-from datetime import datetime, timezone
-import requests
-
-import hashlib
-from datetime import datetime, timezone
-import requests
-
 def get_place_details_and_reviews(place_id: str) -> tuple[dict, list]:
     """
     Mengambil detail lengkap tempat termasuk nama, ulasan, nomor telepon, dan jam operasional
     menggunakan Place Details API, tanpa author_name, language, address_detail, dan relative_time_description.
-    ID review dibuat dari gabungan place_id, author_url, dan waktu ulasan yang di-hash.
+    ID review dibuat dari gabungan place_id, author_url, dan waktu ulasan yang di-hash (BLAKE2b 16 byte, hex).
     """
+    import requests
     fields = "name,reviews,formatted_phone_number,opening_hours,place_id,types,geometry"
     url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={place_id}&fields={fields}&key={GOOGLE_API_KEY}&language=id"
     response = requests.get(url)
+    count(api_calls=1, bytes=len(response.content))
     response.raise_for_status()
     result = response.json().get("result", {})
 
@@ -43,7 +39,7 @@ def get_place_details_and_reviews(place_id: str) -> tuple[dict, list]:
         if r.get('time') and r.get('author_url'):
             timestamp = r.get('time')
             author_url = r.get('author_url')
-            review_id = f"{place_id}_{author_url}_{timestamp}"
+            review_id = hash_review_key(f"{place_id}_{author_url}_{timestamp}")
             
             formatted_reviews.append({
                 "id_review": review_id,
@@ -70,15 +66,41 @@ def get_place_details_and_reviews(place_id: str) -> tuple[dict, list]:
 
     return place_data_from_details, formatted_reviews
 
+def _tweet_coordinates(tweet, places_dict: dict) -> tuple:
+    """Koordinat (lat, lng) tweet: titik geo tweet jika ada, jika tidak titik tengah bounding box
+    place Twitter yang di-tag, hanya bila place itu POI atau bounding box-nya tidak lebih lebar dari
+    TWEET_PLACE_RADIUS_KM. Place tingkat kota/admin (misal "Malang, Indonesia") tidak menunjukkan
+    lokasi wisata tertentu, sehingga hasilnya (None, None)."""
+    if not tweet.geo:
+        return None, None
+    point = (tweet.geo.get("coordinates") or {}).get("coordinates")
+    if point:
+        return point[1], point[0]  # GeoJSON: [lng, lat]
+    place = places_dict.get(tweet.geo.get("place_id"))
+    bbox = (place.geo or {}).get("bbox") if place else None
+    if not bbox:
+        return None, None
+    west, south, east, north = bbox
+    if place.place_type != "poi":
+        # Lebar diukur pada tepi lintang yang paling dekat ke ekuator (tepi terlebar)
+        width_km = max(haversine_km(south, west, south, east), haversine_km(north, west, north, east))
+        height_km = haversine_km(south, west, north, west)
+        if max(width_km, height_km) > TWEET_PLACE_RADIUS_KM:
+            return None, None
+    return (south + north) / 2, (west + east) / 2
+
 def search_tweets(keyword: str, place_id: str, max_results: int = 10) -> list:
     """Mencari tweet berdasarkan kata kunci dan menyertakan place_id dengan field terbatas."""
+    import tweepy  # Diimpor saat dipakai: tweepy lambat diimpor dan hanya dibutuhkan di sini
     client = tweepy.Client(bearer_token=TWITTER_BEARER_TOKEN)
+    count(api_calls=1)
     try:
         res = client.search_recent_tweets(
             query=f'"{keyword}" lang:id -is:retweet',
             max_results=max_results,
             tweet_fields=["created_at", "text", "author_id", "geo"],
             user_fields=["location"],
+            place_fields=["geo", "place_type"],
             expansions=["author_id", "geo.place_id"]
         )
     except tweepy.TweepyException as e:
@@ -90,9 +112,11 @@ def search_tweets(keyword: str, place_id: str, max_results: int = 10) -> list:
         return tweets_output
 
     users_dict = {user["id"]: user for user in res.includes.get("users", [])} if res.includes else {}
+    places_dict = {place["id"]: place for place in res.includes.get("places", [])} if res.includes else {}
 
     for t in res.data:
         user_info = users_dict.get(t.author_id)
+        tweet_lat, tweet_lng = _tweet_coordinates(t, places_dict)
         tweets_output.append({
             "id_tweet": str(t.id),
             "place_id_source": place_id, # Tempat yang dibahas (kueri)
@@ -101,14 +125,20 @@ def search_tweets(keyword: str, place_id: str, max_results: int = 10) -> list:
             "text_tweet": t.text,
             "id_author_twitter": str(t.author_id),
             "author_location": user_info.location if user_info and user_info.location else None,
-            "tweet_geo_place_id": t.geo.get("place_id") if t.geo else None # Tempat asal user yang memposting tweet
+            "tweet_geo_place_id": t.geo.get("place_id") if t.geo else None, # Tempat asal user yang memposting tweet
+            "tweet_lat": tweet_lat,
+            "tweet_lng": tweet_lng,
         })
     return tweets_output
 
+@instrumented("extract_api_data_to_gcs")
+@profiled
 def extract_api_data_to_gcs(query_lokasi_wisata: str = "wisata di Malang"):
     """Fungsi untuk ekstraksi data API dan penyimpanan ke GCS (staging area)."""
+    import requests
     print(f"\n--- Memulai Ekstraksi Data API ke GCS untuk query: '{query_lokasi_wisata}' ---")
-    initial_places_from_search = get_places(query_lokasi_wisata)
+    with stage("text_search"):
+        initial_places_from_search = get_places(query_lokasi_wisata)
 
     if not initial_places_from_search:
         print(f"Tidak ada tempat yang ditemukan untuk query: '{query_lokasi_wisata}'.")
@@ -119,62 +149,84 @@ def extract_api_data_to_gcs(query_lokasi_wisata: str = "wisata di Malang"):
     all_tweets_records = []
     processed_place_ids = set()
 
-    for i, p_basic_search in enumerate(initial_places_from_search):
-        place_id = p_basic_search.get("place_id")
+    with stage("fetch_details_and_tweets"):
+        for i, p_basic_search in enumerate(initial_places_from_search):
+            place_id = p_basic_search.get("place_id")
         
-        if not place_id:
-            print(f"Melewati kandidat tempat tanpa place_id: {p_basic_search.get('name')}")
-            continue
+            if not place_id:
+                print(f"Melewati kandidat tempat tanpa place_id: {p_basic_search.get('name')}")
+                continue
         
-        if place_id in processed_place_ids:
-            print(f"Melewati place_id {place_id} karena sudah diproses.")
-            continue
+            if place_id in processed_place_ids:
+                print(f"Melewati place_id {place_id} karena sudah diproses.")
+                continue
 
-        nama_tempat_search = p_basic_search.get("name", "Nama Tidak Diketahui")
-        print(f"Memproses {i+1}/{len(initial_places_from_search)}: {nama_tempat_search} (ID: {place_id})")
+            nama_tempat_search = p_basic_search.get("name", "Nama Tidak Diketahui")
+            print(f"Memproses {i+1}/{len(initial_places_from_search)}: {nama_tempat_search} (ID: {place_id})")
 
-        try:
-            place_details_data, reviews_for_place = get_place_details_and_reviews(place_id)
+            try:
+                place_details_data, reviews_for_place = get_place_details_and_reviews(place_id)
             
-            merged_place_record = {
-                "place_id": place_id,
-                "name": place_details_data.get("name_detail") or nama_tempat_search,
-                "phone_number": place_details_data.get("phone_number"),
-                "opening_hours_text": place_details_data.get("opening_hours_text"),
-                "types": place_details_data.get("types_detail") or ", ".join(p_basic_search.get("types", [])),
-                "lat": place_details_data.get("lat_detail") or p_basic_search.get("geometry", {}).get("location", {}).get("lat"),
-                "lng": place_details_data.get("lng_detail") or p_basic_search.get("geometry", {}).get("location", {}).get("lng"),
-                "rating_search": p_basic_search.get("rating")
-            }
-            all_places_records.append(merged_place_record)
-
-            all_reviews_records.extend(reviews_for_place)
-
-            nama_untuk_tweet = merged_place_record.get("name")
-            if nama_untuk_tweet:
-                tweets_for_place = search_tweets(nama_untuk_tweet, place_id, max_results=10)
-                all_tweets_records.extend(tweets_for_place)
+                merged_place_record = {
+                    "place_id": place_id,
+                    "name": place_details_data.get("name_detail") or nama_tempat_search,
+                    "phone_number": place_details_data.get("phone_number"),
+                    "opening_hours_text": place_details_data.get("opening_hours_text"),
+                    "types": place_details_data.get("types_detail") or ", ".join(p_basic_search.get("types", [])),
+                    "lat": place_details_data.get("lat_detail") or p_basic_search.get("geometry", {}).get("location", {}).get("lat"),
+                    "lng": place_details_data.get("lng_detail") or p_basic_search.get("geometry", {}).get("location", {}).get("lng"),
+                    "rating_search": p_basic_search.get("rating")
+                }
+                all_places_records.append(merged_place_record)
+
+                all_reviews_records.extend(reviews_for_place)
+
+                nama_untuk_tweet = merged_place_record.get("name")
+                if nama_untuk_tweet:
+                    tweets_for_place = search_tweets(nama_untuk_tweet, place_id, max_results=10)
+                    all_tweets_records.extend(tweets_for_place)
             
-            processed_place_ids.add(place_id)
+                processed_place_ids.add(place_id)
 
-        except requests.exceptions.RequestException as e:
-            print(f"Error HTTP saat mengambil detail untuk place_id {place_id} ({nama_tempat_search}): {e}")
-        except Exception as e:
-            print(f"Error tidak terduga saat memproses place_id {place_id} ({nama_tempat_search}): {e}")
-            import traceback
-            traceback.print_exc()
+            except requests.exceptions.RequestException as e:
+                print(f"Error HTTP saat mengambil detail untuk place_id {place_id} ({nama_tempat_search}): {e}")
+            except Exception as e:
+                print(f"Error tidak terduga saat memproses place_id {place_id} ({nama_tempat_search}): {e}")
+                import traceback
+                traceback.print_exc()
 
     df_places = pd.DataFrame(all_places_records)
     df_reviews = pd.DataFrame(all_reviews_records)
     df_tweets = pd.DataFrame(all_tweets_records)
 
     current_date_str = datetime.now(timezone.utc).strftime("%Y%m%d")
-    save_df_to_gcs(df_places, GCS_BUCKET_NAME_API, GCS_PLACES_PREFIX, f"places_data_{current_date_str}")
-    save_df_to_gcs(df_reviews, GCS_BUCKET_NAME_API, GCS_REVIEWS_PREFIX, f"reviews_data_{current_date_str}")
-    save_df_to_gcs(df_tweets, GCS_BUCKET_NAME_API, GCS_TWEETS_PREFIX, f"tweets_data_{current_date_str}")
+    with stage("save_to_gcs"):
+        save_df_to_gcs(df_places, GCS_BUCKET_NAME_API, GCS_PLACES_PREFIX, f"places_data_{current_date_str}")
+        save_df_to_gcs(df_reviews, GCS_BUCKET_NAME_API, GCS_REVIEWS_PREFIX, f"reviews_data_{current_date_str}")
+        save_df_to_gcs(df_tweets, GCS_BUCKET_NAME_API, GCS_TWEETS_PREFIX, f"tweets_data_{current_date_str}")
 
     print("\nEkstraksi data API dan penyimpanan ke GCS selesai.")
     print(f"Total tempat unik diproses: {len(processed_place_ids)}")
     print(f"Total record tempat: {len(df_places)}")
     print(f"Total record review: {len(df_reviews)}")
     print(f"Total record tweet: {len(df_tweets)}")
+
+@instrumented("notify_manual_upload_expectation")
+def notify_manual_upload_expectation():
+    """Mencatat jumlah file keuangan manual (pemasukan/pengeluaran) di staging GCS
+    dan memberi peringatan jika belum ada file yang diunggah hari ini."""
+    from google.cloud import storage
+    storage_client = storage.Client()
+    today = datetime.now(timezone.utc).date()
+
+    print("\n--- Mengecek Upload Data Keuangan Manual di GCS ---")
+    for jenis, gcs_prefix in [("pemasukan", GCS_PEMASUKAN_PREFIX), ("pengeluaran", GCS_PENGELUARAN_PREFIX)]:
+        blobs = [
+            blob for blob in storage_client.list_blobs(GCS_BUCKET_NAME_MANUAL, prefix=gcs_prefix)
+            if blob.name.endswith('.csv')
+        ]
+        count(api_calls=1)
+        uploaded_today = sum(1 for blob in blobs if blob.updated and blob.updated.date() == today)
+        print(f"File {jenis}: total {len(blobs)}, diunggah hari ini {uploaded_today} (gs://{GCS_BUCKET_NAME_MANUAL}/{gcs_prefix})")
+        if uploaded_today == 0:
+            print(f"PERINGATAN: belum ada upload {jenis} hari ini. Jalankan manual_tools/manual_finance_uploader.py jika ada transaksi baru.")
@@ -0,0 +1,183 @@
+import functools
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from data.config import SQL_ALCHEMY_DATABASE_URL
+
+XCOM_METRICS_KEY = "etl_metrics"
+# Tabel riwayat ringkasan per run DAG di database operasional (dipakai bersama semua worker),
+# untuk melihat tren antar-run
+METRICS_HISTORY_TABLE = "etl_metrics_history"
+# Prefix counter jumlah baris yang ditolak per aturan validasi: "rejected:<entitas>:<aturan>"
+REJECT_COUNTER_PREFIX = "rejected:"
+
+# Stack span yang sedang aktif dan daftar span yang sudah selesai untuk task berjalan
+_active_spans = []
+_finished_spans = []
+
+
+class Span:
+    """Satu tahap (stage) ETL yang diukur: durasi dan counter (rows_in, rows_out, bytes, api_calls)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counters = {}
+        self.started_at = None
+        self.duration_s = None
+
+    def add(self, **counters):
+        """Menambahkan nilai counter hanya ke span ini."""
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + (value or 0)
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.name,
+            "started_at": self.started_at,
+            "duration_s": round(self.duration_s, 4) if self.duration_s is not None else None,
+            **self.counters,
+        }
+
+
+def count(**counters):
+    """Menambahkan counter ke semua span yang sedang aktif (sub-step ikut teragregasi ke induknya)."""
+    for span in _active_spans:
+        span.add(**counters)
+
+
+@contextmanager
+def stage(name: str):
+    """Context manager untuk mengukur satu tahap/sub-tahap ETL dan mencatatnya sebagai log JSON."""
+    full_name = f"{_active_spans[-1].name}.{name}" if _active_spans else name
+    span = Span(full_name)
+    span.started_at = datetime.now(timezone.utc).isoformat()
+    _active_spans.append(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span.duration_s = time.perf_counter() - start
+        _active_spans.pop()
+        _finished_spans.append(span)
+        print(json.dumps({"event": "etl_stage", **span.to_dict()}))
+
+
+def _push_metrics_to_xcom(metrics: list):
+    """Mengirim metrik task ke XCom jika dijalankan di dalam Airflow."""
+    try:
+        from airflow.operators.python import get_current_context
+        context = get_current_context()
+    except Exception:
+        # Dijalankan di luar Airflow (misal manual/lokal): cukup log JSON saja
+        return
+    context["ti"].xcom_push(key=XCOM_METRICS_KEY, value=metrics)
+
+
+def instrumented(task_name: str):
+    """Decorator untuk callable PythonOperator: membungkus seluruh task dalam satu stage
+    dan mengirim semua span yang tercatat ke XCom."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            _finished_spans.clear()
+            try:
+                with stage(task_name):
+                    return func(*args, **kwargs)
+            finally:
+                _push_metrics_to_xcom([span.to_dict() for span in _finished_spans])
+        return wrapper
+    return decorator
+
+
+def _save_run_summary(run_summary: dict, history_limit: int) -> list:
+    """Menyimpan (upsert per run_id, aman untuk retry) ringkasan run ke database operasional dan
+    mengembalikan `history_limit` ringkasan terakhir, terlama lebih dulu."""
+    from sqlalchemy import create_engine, text
+    engine = create_engine(SQL_ALCHEMY_DATABASE_URL)
+    with engine.begin() as connection:
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {METRICS_HISTORY_TABLE} (
+                run_id TEXT PRIMARY KEY,
+                recorded_at TIMESTAMP NOT NULL,
+                summary TEXT NOT NULL
+            );
+        """))
+        connection.execute(text(f"DELETE FROM {METRICS_HISTORY_TABLE} WHERE run_id = :run_id"),
+                           {"run_id": run_summary["run_id"]})
+        connection.execute(
+            text(f"INSERT INTO {METRICS_HISTORY_TABLE} (run_id, recorded_at, summary) "
+                 f"VALUES (:run_id, :recorded_at, :summary)"),
+            {"run_id": run_summary["run_id"], "recorded_at": run_summary["recorded_at"],
+             "summary": json.dumps(run_summary)},
+        )
+        rows = connection.execute(
+            text(f"SELECT summary FROM {METRICS_HISTORY_TABLE} ORDER BY recorded_at DESC LIMIT :limit"),
+            {"limit": history_limit},
+        ).fetchall()
+    return [json.loads(row[0]) for row in reversed(rows)]
+
+
+def _format_summary_table(rows: list) -> str:
+    columns = ["stage", "duration_s", "rows_in", "rows_out", "rows_rejected", "bytes", "api_calls"]
+    widths = {col: max(len(col), *(len(str(row.get(col, ""))) for row in rows)) for col in columns}
+    lines = [" | ".join(col.ljust(widths[col]) for col in columns)]
+    lines.append("-+-".join("-" * widths[col] for col in columns))
+    for row in rows:
+        lines.append(" | ".join(str(row.get(col, "")).ljust(widths[col]) for col in columns))
+    return "\n".join(lines)
+
+
+def summarize_etl_run_metrics(task_ids: list, history_limit: int = 7):
+    """Callable task terakhir DAG: mengumpulkan metrik semua task dari XCom, mencetak tabel
+    ringkasan, dan menyimpan total per run ke tabel riwayat di database operasional agar tren
+    antar-run terlihat dari worker mana pun."""
+    from airflow.operators.python import get_current_context
+    context = get_current_context()
+    ti = context["ti"]
+
+    rows = []
+    for task_id in task_ids:
+        metrics = ti.xcom_pull(task_ids=task_id, key=XCOM_METRICS_KEY) or []
+        rows.extend(metrics)
+
+    if not rows:
+        print("Tidak ada metrik ETL yang tercatat untuk run ini.")
+        return
+
+    print(f"\n--- Ringkasan Metrik ETL (run_id: {context['run_id']}) ---")
+    print(_format_summary_table(rows))
+
+    top_level = {row["stage"]: row for row in rows if "." not in row["stage"]}
+    # Counter ikut teragregasi ke span induk, jadi penolakan per aturan cukup diambil dari span task
+    rejects = {}
+    for row in top_level.values():
+        for key, value in row.items():
+            if key.startswith(REJECT_COUNTER_PREFIX):
+                rule = key[len(REJECT_COUNTER_PREFIX):]
+                rejects[rule] = rejects.get(rule, 0) + value
+    if rejects:
+        print("\n--- Penolakan Validasi per Aturan ---")
+        print("\n".join(f"{n:>10}  {rule}" for rule, n in sorted(rejects.items())))
+
+    run_summary = {
+        "run_id": context["run_id"],
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "total_duration_s": round(sum(row.get("duration_s") or 0 for row in top_level.values()), 4),
+        "tasks": {name: row.get("duration_s") for name, row in top_level.items()},
+        "rejects": rejects,
+    }
+    print(json.dumps({"event": "etl_run_summary", **run_summary}))
+
+    try:
+        history = _save_run_summary(run_summary, history_limit)
+        print(f"\n--- Tren {len(history)} run terakhir ---")
+        print(_format_summary_table([
+            {"stage": h["run_id"], "duration_s": h["total_duration_s"]} for h in history
+        ]))
+    except Exception as e:
+        # Kegagalan menyimpan riwayat tidak boleh menggagalkan task ringkasan
+        print(f"Gagal menyimpan riwayat metrik ETL ke tabel {METRICS_HISTORY_TABLE}: {e}")
+
+    return run_summary
@@ -0,0 +1,117 @@
+import functools
+import io
+import os
+from datetime import datetime, timezone
+
+from data.config import ETL_PROFILE_TASKS, ETL_PROFILE_OUTPUT_PATH
+
+PROFILE_PARAM_NAME = "profile_tasks"
+
+
+def _current_airflow_context():
+    """Mengambil context Airflow jika callable dijalankan sebagai task; None jika di luar Airflow."""
+    try:
+        from airflow.operators.python import get_current_context
+        return get_current_context()
+    except Exception:
+        return None
+
+
+def _parse_targets(value) -> set:
+    """Nama target dari string dipisah koma (misal "all" atau "task_a,task_b") atau list nama."""
+    if not value:
+        return set()
+    if isinstance(value, str):
+        value = value.split(",")
+    return {str(name).strip() for name in value if str(name).strip()}
+
+
+def _requested_profile_targets(context) -> set:
+    """Gabungan target profiling dari env var ETL_PROFILE_TASKS dan DAG param 'profile_tasks'.
+    Param boleh berupa list atau string (dipisah koma), sama seperti env var."""
+    targets = _parse_targets(ETL_PROFILE_TASKS)
+    if context is not None:
+        params = context.get("params") or {}
+        targets.update(_parse_targets(params.get(PROFILE_PARAM_NAME)))
+    return targets
+
+
+def _write_report(report_name: str, content, binary: bool = False):
+    """Menulis laporan profiling ke direktori lokal atau ke GCS (jika path diawali gs://)."""
+    if ETL_PROFILE_OUTPUT_PATH.startswith("gs://"):
+        from google.cloud import storage
+        bucket_name, _, prefix = ETL_PROFILE_OUTPUT_PATH[len("gs://"):].partition("/")
+        blob_name = f"{prefix.rstrip('/')}/{report_name}" if prefix else report_name
+        blob = storage.Client().bucket(bucket_name).blob(blob_name)
+        if binary:
+            blob.upload_from_string(content, content_type="application/octet-stream")
+        else:
+            blob.upload_from_string(content, content_type="text/plain")
+        location = f"gs://{bucket_name}/{blob_name}"
+    else:
+        os.makedirs(ETL_PROFILE_OUTPUT_PATH, exist_ok=True)
+        location = os.path.join(ETL_PROFILE_OUTPUT_PATH, report_name)
+        with open(location, "wb" if binary else "w") as f:
+            f.write(content)
+    print(f"Laporan profiling disimpan ke: {location}")
+
+
+def _run_with_profiling(func, task_name: str, args, kwargs, top_n: int = 30):
+    """Menjalankan callable di bawah cProfile dan tracemalloc, lalu menulis laporannya."""
+    import cProfile
+    import marshal
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        report_prefix = f"{task_name}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}"
+        try:
+            stats_buffer = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stats_buffer)
+            stats.sort_stats("cumulative").print_stats(top_n)
+            _write_report(f"{report_prefix}_cpu.txt", stats_buffer.getvalue())
+            # File .prof bisa dibuka dengan snakeviz / pstats untuk analisis lebih lanjut
+            _write_report(f"{report_prefix}.prof", marshal.dumps(stats.stats), binary=True)
+
+            memory_lines = [
+                f"Peak memory (tracemalloc): {peak_bytes / 1024 / 1024:.2f} MiB",
+                f"Memory saat selesai: {current_bytes / 1024 / 1024:.2f} MiB",
+                "",
+                f"Top {top_n} alokasi berdasarkan baris kode:",
+            ]
+            for stat in snapshot.statistics("lineno")[:top_n]:
+                memory_lines.append(str(stat))
+            _write_report(f"{report_prefix}_memory.txt", "\n".join(memory_lines))
+            print(f"Profiling {task_name} selesai. Peak memory: {peak_bytes / 1024 / 1024:.2f} MiB")
+        except Exception as e:
+            # Kegagalan menulis laporan tidak boleh menggagalkan task ETL
+            print(f"Gagal menyimpan laporan profiling untuk {task_name}: {e}")
+
+
+def profiled(func):
+    """Decorator opt-in untuk callable PythonOperator: profiling CPU (cProfile) dan memori
+    (tracemalloc) hanya aktif bila nama callable atau task_id tercantum di env var
+    ETL_PROFILE_TASKS atau DAG param 'profile_tasks'. Bila tidak aktif, callable dipanggil langsung."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        context = _current_airflow_context()
+        targets = _requested_profile_targets(context)
+        if not targets:
+            return func(*args, **kwargs)
+
+        task_id = context["ti"].task_id if context is not None else None
+        if "all" not in targets and func.__name__ not in targets and task_id not in targets:
+            return func(*args, **kwargs)
+
+        return _run_with_profiling(func, task_id or func.__name__, args, kwargs)
+    return wrapper
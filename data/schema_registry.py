@@ -0,0 +1,90 @@
+import hashlib
+import re
+from datetime import datetime, timezone
+
+import pandas as pd
+from sqlalchemy import text
+
+# Tabel registry di database operasional: satu baris per target (misal "bigquery.dim_place")
+# berisi fingerprint DDL yang terakhir berhasil dijalankan.
+REGISTRY_TABLE = "schema_registry"
+
+
+def ddl_fingerprint(sql: str) -> str:
+    """Fingerprint DDL: SHA-256 dari teks DDL yang whitespace-nya dinormalisasi."""
+    normalized = " ".join(sql.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def declared_columns(sql: str) -> dict:
+    """Mengambil kolom dan tipenya ({nama: tipe}) dari satu pernyataan CREATE TABLE."""
+    body = sql[sql.index("(") + 1:sql.rindex(")")]
+    return {
+        name: column_type
+        for name, column_type in re.findall(r"^\s*(\w+)\s+(\w+)", body, re.MULTILINE)
+        if name.upper() not in ("PRIMARY", "FOREIGN", "CONSTRAINT")
+    }
+
+
+def load_registry(engine) -> dict:
+    """Membaca fingerprint yang tersimpan: {target: fingerprint}."""
+    with engine.begin() as connection:
+        connection.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {REGISTRY_TABLE} (
+                target TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                applied_at TIMESTAMP
+            );
+        """))
+    df_registry = pd.read_sql_query(f"SELECT target, fingerprint FROM {REGISTRY_TABLE}", engine)
+    return dict(zip(df_registry["target"], df_registry["fingerprint"]))
+
+
+def save_fingerprints(engine, fingerprints: dict):
+    """Menyimpan (upsert) fingerprint target yang DDL-nya baru saja berhasil dijalankan."""
+    if not fingerprints:
+        return
+    applied_at = datetime.now(timezone.utc).isoformat()
+    with engine.begin() as connection:
+        for target, fingerprint in fingerprints.items():
+            connection.execute(text(f"DELETE FROM {REGISTRY_TABLE} WHERE target = :target"), {"target": target})
+            connection.execute(
+                text(f"INSERT INTO {REGISTRY_TABLE} (target, fingerprint, applied_at) VALUES (:target, :fingerprint, :applied_at)"),
+                {"target": target, "fingerprint": fingerprint, "applied_at": applied_at},
+            )
+
+
+def pending_ddl(registry: dict, namespace: str, tables: dict, missing_tables=()) -> dict:
+    """Memilih DDL yang perlu dijalankan: fingerprint berubah/belum tercatat, atau tabel tidak ada.
+    Mengembalikan {nama_tabel: (sql, fingerprint)}."""
+    pending = {}
+    for name, sql in tables.items():
+        fingerprint = ddl_fingerprint(sql)
+        if registry.get(f"{namespace}.{name}") != fingerprint or name in missing_tables:
+            pending[name] = (sql, fingerprint)
+    return pending
+
+
+def report_drift(namespace: str, declared: dict, actual: dict) -> set:
+    """Membandingkan skema yang dideklarasikan dengan skema aktual.
+    declared/actual: {tabel: {kolom: tipe}}; actual[tabel] bernilai None jika tabel tidak ada.
+    Tipe None berarti tipe tidak dibandingkan. Mengembalikan himpunan tabel yang tidak ada."""
+    missing_tables = set()
+    for table_name, declared_cols in declared.items():
+        actual_cols = actual.get(table_name)
+        if actual_cols is None:
+            missing_tables.add(table_name)
+            continue
+        missing_cols = [col for col in declared_cols if col not in actual_cols]
+        extra_cols = [col for col in actual_cols if col not in declared_cols]
+        type_diffs = [
+            f"{col} ({actual_cols[col]} != {declared_type})"
+            for col, declared_type in declared_cols.items()
+            if col in actual_cols and declared_type and actual_cols[col] and actual_cols[col] != declared_type
+        ]
+        if missing_cols or extra_cols or type_diffs:
+            print(
+                f"PERINGATAN drift skema {namespace}.{table_name}: "
+                f"kolom hilang={missing_cols}, kolom tambahan={extra_cols}, tipe berbeda={type_diffs}"
+            )
+    return missing_tables
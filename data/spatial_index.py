@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0088
+# Panjang satu derajat lintang pada bola yang sama dengan haversine_km
+KM_PER_DEGREE_LAT = np.pi * EARTH_RADIUS_KM / 180
+# Margin relatif ukuran sel terhadap galat pembulatan floating point
+_CELL_SIZE_MARGIN = 1e-9
+
+# Kunci sel gabungan (cell_x, cell_y) -> satu int64 agar join kandidat cukup pada satu kolom
+_CELL_KEY_FACTOR = 1 << 32
+
+
+def _cell_keys(cell_x, cell_y):
+    return cell_x.astype("int64") * _CELL_KEY_FACTOR + cell_y.astype("int64")
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Jarak great-circle (km) secara vektor antara array koordinat."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype="float64")) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class PlaceGridIndex:
+    """Indeks grid seragam atas koordinat tempat wisata (places.lat/lng).
+
+    Ukuran sel >= selisih lintang/bujur maksimum dua titik yang berjarak haversine <= radius,
+    sehingga tempat dalam radius suatu titik selalu berada di sel titik itu atau 8 sel tetangganya.
+    Pencarian tempat terdekat cukup memeriksa kandidat di 3x3 sel, bukan seluruh tempat
+    (menghindari scan O(n·m))."""
+
+    def __init__(self, df_places: pd.DataFrame, radius_km: float):
+        self.radius_km = radius_km
+        places = df_places[["place_id", "lat", "lng"]].dropna()
+        places = places.astype({"lat": "float64", "lng": "float64"}).reset_index(drop=True)
+
+        # Selisih lintang dua titik dalam radius tidak pernah melebihi radius / panjang derajat lintang
+        self.cell_size_lat = radius_km / KM_PER_DEGREE_LAT * (1 + _CELL_SIZE_MARGIN)
+        # Selisih bujur maksimum bergantung pada lintang terjauh dari ekuator di antara kedua titik.
+        # Titik query yang cocok dengan suatu tempat berada paling jauh satu radius dari lintang tempat,
+        # jadi batas lintangnya = lintang absolut tempat terbesar + radius (dalam derajat).
+        max_abs_lat = (float(places["lat"].abs().max()) if not places.empty else 0.0) + self.cell_size_lat
+        self.cell_size_lng = self._max_lng_delta(radius_km, max_abs_lat) * (1 + _CELL_SIZE_MARGIN)
+
+        cell_x = np.floor(places["lng"].to_numpy() / self.cell_size_lng)
+        cell_y = np.floor(places["lat"].to_numpy() / self.cell_size_lat)
+        self.places = places.assign(cell_key=_cell_keys(cell_x, cell_y))
+
+    @staticmethod
+    def _max_lng_delta(radius_km: float, max_abs_lat: float) -> float:
+        """Selisih bujur terbesar (derajat) dua titik berjarak haversine <= radius_km yang lintang
+        absolutnya <= max_abs_lat: dari sin(dλ/2) <= sin(d/2R) / cos(φ_max)."""
+        cos_lat = np.cos(np.radians(min(max_abs_lat, 90.0)))
+        ratio = np.sin(radius_km / (2 * EARTH_RADIUS_KM)) / cos_lat if cos_lat > 0 else np.inf
+        if ratio >= 1:
+            return 360.0
+        return float(np.degrees(2 * np.arcsin(ratio)))
+
+    def nearest(self, lat: pd.Series, lng: pd.Series) -> pd.DataFrame:
+        """Tempat terdekat dalam radius untuk setiap titik. Mengembalikan DataFrame ber-index sama
+        dengan input, kolom place_id dan jarak_km (NaN/None jika tidak ada tempat dalam radius)."""
+        result = pd.DataFrame({"place_id": pd.Series(None, index=lat.index, dtype="object"),
+                               "jarak_km": np.nan}, index=lat.index)
+        points = pd.DataFrame({"lat": lat, "lng": lng}).dropna().astype("float64")
+        if points.empty or self.places.empty:
+            return result
+
+        point_x = np.floor(points["lng"].to_numpy() / self.cell_size_lng)
+        point_y = np.floor(points["lat"].to_numpy() / self.cell_size_lat)
+        point_index = points.index.to_numpy()
+
+        candidates = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                neighbor = pd.DataFrame({
+                    "point": point_index,
+                    "cell_key": _cell_keys(point_x + dx, point_y + dy),
+                })
+                candidates.append(neighbor.merge(self.places, on="cell_key", how="inner"))
+        df_candidates = pd.concat(candidates, ignore_index=True)
+        if df_candidates.empty:
+            return result
+
+        point_coords = points.loc[df_candidates["point"]]
+        df_candidates["jarak_km"] = haversine_km(
+            point_coords["lat"].to_numpy(), point_coords["lng"].to_numpy(),
+            df_candidates["lat"].to_numpy(), df_candidates["lng"].to_numpy(),
+        )
+        nearest = (
+            df_candidates[df_candidates["jarak_km"] <= self.radius_km]
+            .sort_values(["point", "jarak_km"])
+            .drop_duplicates(subset=["point"])
+            .set_index("point")
+        )
+        result.loc[nearest.index, "place_id"] = nearest["place_id"].astype("object")
+        result.loc[nearest.index, "jarak_km"] = nearest["jarak_km"]
+        return result
@@ -0,0 +1,165 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from sqlalchemy import create_engine, bindparam, text
+
+from data.config import SQL_ALCHEMY_DATABASE_URL, BIGQUERY_PROJECT_ID, \
+    TEXT_ENRICHMENT_WORKERS, TEXT_ENRICHMENT_BATCH_SIZE
+from data.instrumentation import instrumented, stage, count
+from data.profiling import profiled
+
+CACHE_TABLE = "text_enrichment_cache"
+# Jumlah hash per query lookup cache (di bawah batas parameter SQLite)
+CACHE_LOOKUP_CHUNK_SIZE = 500
+TOP_KEYWORDS = 5
+# Versi logika enrichment, ikut dalam hash cache: naikkan saat normalisasi/skor berubah
+# agar hasil lama di cache tidak dipakai lagi
+ENRICHMENT_VERSION = b"enrich-v2"
+
+URL_PATTERN = r"https?://\S+|www\.\S+"
+MENTION_HASHTAG_PATTERN = r"[@#]\w+"
+# Semua selain huruf a-z dan spasi (angka, tanda baca, emoji/simbol) dibuang
+NON_LETTER_PATTERN = r"[^a-z\s]"
+
+STOPWORDS_ID = frozenset("""
+    ada adalah agar akan aku anda apa atau bagi bahwa banyak beberapa begitu belum bisa buat dalam dan dari
+    dengan di dia ini itu jadi jika juga kali kalau kami kamu karena ke kita lagi lah lebih masih mau
+    mereka nya oleh pada para pun saat saja sama sangat saya se sebagai sedang sudah supaya tapi telah
+    tentang tersebut untuk yang ya yg dgn utk aja kok deh sih nih tuh dong
+""".split())
+
+# Kata negasi: bukan stopword, karena membalik polaritas kata leksikon tepat sesudahnya
+# ("tidak bersih" negatif); tidak dijadikan kata kunci
+NEGATORS_ID = frozenset("tidak tak tdk bukan belum kurang ga gak gk nggak ngga enggak engga".split())
+
+# Leksikon sentimen sederhana (bahasa Indonesia): +1 positif, -1 negatif
+SENTIMENT_LEXICON_ID = {
+    **dict.fromkeys("""
+        bagus indah cantik bersih nyaman ramah murah puas senang suka keren mantap asri sejuk enak
+        rekomendasi recommended terbaik menarik luas aman lengkap seru istimewa memuaskan worth
+    """.split(), 1),
+    **dict.fromkeys("""
+        jelek kotor mahal kecewa buruk rusak bau panas macet antri antre sempit kumuh jorok parah
+        mengecewakan lambat berbahaya sampah tutup sepi kasar pungli
+    """.split(), -1),
+}
+
+
+def text_hash(text: str) -> str:
+    """Hash teks (BLAKE2b 16 byte, hex) sebagai kunci cache hasil enrichment."""
+    return hashlib.blake2b((text or "").encode("utf-8"), digest_size=16, person=ENRICHMENT_VERSION).hexdigest()
+
+
+def enrich_batch(texts: list) -> pd.DataFrame:
+    """Normalisasi teks, ekstraksi kata kunci, dan skor sentimen berbasis leksikon untuk satu batch,
+    diproses vektor dengan operasi string pandas (bukan loop per teks)."""
+    series = pd.Series(texts, dtype="object").fillna("")
+    normalized = (
+        series.str.lower()
+        .str.replace(URL_PATTERN, " ", regex=True)
+        .str.replace(MENTION_HASHTAG_PATTERN, " ", regex=True)
+        .str.replace(NON_LETTER_PATTERN, " ", regex=True)
+    )
+    raw_tokens = normalized.str.split().explode().dropna()
+    is_negator = raw_tokens.isin(NEGATORS_ID)
+    tokens = raw_tokens[((raw_tokens.str.len() > 2) & ~raw_tokens.isin(STOPWORDS_ID)) | is_negator]
+    content_tokens = tokens[~tokens.isin(NEGATORS_ID)]
+
+    teks_normal = tokens.groupby(level=0).agg(" ".join).reindex(series.index, fill_value="")
+
+    # Polaritas dinilai pada urutan token mentah: kata leksikon tepat setelah negasi dibalik
+    negated = is_negator.groupby(level=0).shift(1, fill_value=False).astype(bool)
+    polarity = raw_tokens.map(SENTIMENT_LEXICON_ID).fillna(0).where(~negated, lambda p: -p)
+    skor_sentimen = (polarity.groupby(level=0).sum() / content_tokens.groupby(level=0).size()) \
+        .reindex(series.index).fillna(0.0)
+
+    tokens = content_tokens
+    token_counts = tokens.groupby([tokens.index, tokens.values]).size().rename("jumlah").reset_index()
+    token_counts.columns = ["row", "token", "jumlah"]
+    top_tokens = (
+        token_counts.sort_values(["row", "jumlah", "token"], ascending=[True, False, True])
+        .groupby("row").head(TOP_KEYWORDS)
+    )
+    kata_kunci = top_tokens.groupby("row")["token"].agg(", ".join).reindex(series.index, fill_value="")
+
+    return pd.DataFrame({
+        "teks_normal": teks_normal.values,
+        "kata_kunci": kata_kunci.values,
+        "skor_sentimen": skor_sentimen.astype("float64").values,
+    })
+
+
+def enrich_texts_parallel(texts: list) -> pd.DataFrame:
+    """Memproses teks dalam batch di process pool; urutan hasil sama dengan urutan input."""
+    batches = [texts[i:i + TEXT_ENRICHMENT_BATCH_SIZE] for i in range(0, len(texts), TEXT_ENRICHMENT_BATCH_SIZE)]
+    if len(batches) <= 1 or TEXT_ENRICHMENT_WORKERS <= 1:
+        results = [enrich_batch(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=min(TEXT_ENRICHMENT_WORKERS, len(batches))) as executor:
+            results = list(executor.map(enrich_batch, batches))
+    return pd.concat(results, ignore_index=True) if results else enrich_batch([])
+
+
+def _read_cache(hashes: list, engine) -> pd.DataFrame:
+    """Membaca entri cache hanya untuk hash yang diminta (per chunk), bukan seluruh tabel cache."""
+    query = text(f"SELECT * FROM {CACHE_TABLE} WHERE text_hash IN :hashes") \
+        .bindparams(bindparam("hashes", expanding=True))
+    chunks = [
+        pd.read_sql_query(query, engine, params={"hashes": hashes[i:i + CACHE_LOOKUP_CHUNK_SIZE]})
+        for i in range(0, len(hashes), CACHE_LOOKUP_CHUNK_SIZE)
+    ]
+    if not chunks:
+        return pd.DataFrame(columns=["text_hash", "teks_normal", "kata_kunci", "skor_sentimen"])
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _enrich_with_cache(df: pd.DataFrame, text_column: str, engine) -> pd.DataFrame:
+    """Menambahkan kolom enrichment ke df. Teks yang hash-nya sudah ada di cache tidak diproses ulang;
+    hasil teks baru disimpan ke cache."""
+    df = df.assign(text_hash=df[text_column].map(text_hash))
+    df_cache = _read_cache(df["text_hash"].unique().tolist(), engine)
+
+    df_missing = df.loc[~df["text_hash"].isin(df_cache["text_hash"]), ["text_hash", text_column]] \
+        .drop_duplicates(subset=["text_hash"])
+    if not df_missing.empty:
+        with stage("enrich_new_texts"):
+            df_enriched = enrich_texts_parallel(df_missing[text_column].tolist())
+            df_enriched.insert(0, "text_hash", df_missing["text_hash"].values)
+            df_enriched.to_sql(CACHE_TABLE, engine, if_exists="append", index=False)
+            count(rows_out=len(df_enriched))
+        df_cache = pd.concat([df_cache, df_enriched], ignore_index=True)
+    print(f"Enrichment {text_column}: {len(df_missing)} teks baru diproses, "
+          f"{df['text_hash'].nunique() - len(df_missing)} diambil dari cache.")
+
+    return df.merge(df_cache, on="text_hash", how="left")
+
+
+@instrumented("enrich_text_for_data_mart")
+@profiled
+def enrich_text_for_data_mart():
+    """Tahap enrichment teks review dan tweet: hasil dimuat ke tabel samping data mart
+    (enrich_maps per id_review, enrich_twitter per id_tweet)."""
+    from google.cloud import bigquery
+    from data.transformation_dw import load_df_to_bigquery
+
+    print("\n--- Enrichment Teks Review dan Tweet ---")
+    engine = create_engine(SQL_ALCHEMY_DATABASE_URL)
+    bigquery_client = bigquery.Client(project=BIGQUERY_PROJECT_ID)
+
+    for table_name, id_column, text_column, target_table in [
+        ("reviews", "id_review", "review_text", "enrich_maps"),
+        ("tweets", "id_tweet", "text_tweet", "enrich_twitter"),
+    ]:
+        with stage(target_table):
+            df_source = pd.read_sql_query(
+                f"SELECT {id_column}, {text_column} FROM {table_name} WHERE {text_column} IS NOT NULL", engine
+            )
+            count(rows_in=len(df_source))
+            if df_source.empty:
+                print(f"Tidak ada teks {table_name} untuk di-enrich.")
+                continue
+            df_enriched = _enrich_with_cache(df_source, text_column, engine)
+            df_side = df_enriched[[id_column, "teks_normal", "kata_kunci", "skor_sentimen"]] \
+                .drop_duplicates(subset=[id_column])
+            load_df_to_bigquery(bigquery_client, df_side, target_table)
@@ -1,21 +1,25 @@
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
 from data.config import OPERATIONAL_DB_PATH, SQL_ALCHEMY_DATABASE_URL, \
     GCS_BUCKET_NAME_API, GCS_BUCKET_NAME_MANUAL, \
     GCS_PLACES_PREFIX, GCS_REVIEWS_PREFIX, GCS_TWEETS_PREFIX, \
     GCS_PEMASUKAN_PREFIX, GCS_PENGELUARAN_PREFIX
-from data.utils import load_csv_from_gcs_to_df
-
-from sqlalchemy import create_engine, text
+from data.utils import load_csv_from_gcs_to_df, hash_review_key, normalize_review_ids
+from data.instrumentation import instrumented, stage, count
+from data.profiling import profiled
+from data.schema_registry import load_registry, save_fingerprints, pending_ddl, declared_columns, report_drift
+from data.validation import validate, record_hashes, QUARANTINE_TABLE
+from data.dtypes import apply_dtype_plan
+from data.aggregation import record_pending_periods
 
+@instrumented("create_operational_db_schema")
+@profiled
 def create_operational_db_schema():
     """Membuat skema tabel di database operasional (Cloud SQL) sesuai data ekstraksi API."""
     print("\n--- Membuat Skema Database Operasional ---")
     
-    engine = create_engine(SQL_ALCHEMY_DATABASE_URL)
-    
-    with engine.connect() as connection:
-        connection.execute(text("""
+    tables = {
+        "places": """
             CREATE TABLE IF NOT EXISTS places (
                 place_id TEXT PRIMARY KEY,
                 name TEXT,
@@ -26,35 +30,35 @@ def create_operational_db_schema():
                 lng REAL,
                 rating_search REAL
             );
-        """))
-        
-        connection.execute(text("""
+        """,
+        "reviews": """
             CREATE TABLE IF NOT EXISTS reviews (
                 id_review TEXT PRIMARY KEY,
-                timestamp_review TIMESTAMP,
+                timestamp_review TIMESTAMP NOT NULL,
                 place_id TEXT,
                 author_url TEXT,
-                review_text TEXT
+                review_text TEXT,
+                rating REAL
             );
-        """))
-        
-        connection.execute(text("""
+        """,
+        "tweets": """
             CREATE TABLE IF NOT EXISTS tweets (
                 id_tweet TEXT PRIMARY KEY,
                 place_id_source TEXT,
                 keyword_search TEXT,
-                created_at_tweet TIMESTAMP,
+                created_at_tweet TIMESTAMP NOT NULL,
                 text_tweet TEXT,
                 id_author_twitter TEXT,
                 author_location TEXT,
-                tweet_geo_place_id TEXT
+                tweet_geo_place_id TEXT,
+                tweet_lat REAL,
+                tweet_lng REAL
             );
-        """))
-        
-        connection.execute(text("""
+        """,
+        "pemasukan": """
             CREATE TABLE IF NOT EXISTS pemasukan (
                 id_transaksi_original TEXT PRIMARY KEY,
-                timestamp TIMESTAMP,
+                timestamp TIMESTAMP NOT NULL,
                 id_proyek TEXT,
                 nama_proyek TEXT,
                 sektor_pariwisata TEXT,
@@ -62,15 +66,14 @@ def create_operational_db_schema():
                 nama_penyumbang TEXT,
                 jenis_penyumbang TEXT,
                 jenis_pemasukan TEXT,
-                jumlah INTEGER,
+                jumlah INTEGER NOT NULL,
                 bukti TEXT
             );
-        """))
-        
-        connection.execute(text("""
+        """,
+        "pengeluaran": """
             CREATE TABLE IF NOT EXISTS pengeluaran (
                 id_transaksi_original TEXT PRIMARY KEY,
-                timestamp TIMESTAMP,
+                timestamp TIMESTAMP NOT NULL,
                 id_proyek TEXT,
                 nama_proyek TEXT,
                 sektor_pariwisata TEXT,
@@ -79,22 +82,161 @@ def create_operational_db_schema():
                 id_departemen TEXT,
                 nama_departemen TEXT,
                 jenis_kebutuhan TEXT,
-                jumlah INTEGER,
+                jumlah INTEGER NOT NULL,
                 bukti TEXT
             );
-        """))
-        
-        connection.commit()
-    
+        """,
+        "review_id_migration": """
+            CREATE TABLE IF NOT EXISTS review_id_migration (
+                old_id_review TEXT PRIMARY KEY,
+                new_id_review TEXT NOT NULL
+            );
+        """,
+        "text_enrichment_cache": """
+            CREATE TABLE IF NOT EXISTS text_enrichment_cache (
+                text_hash TEXT PRIMARY KEY,
+                teks_normal TEXT,
+                kata_kunci TEXT,
+                skor_sentimen REAL
+            );
+        """,
+        "aggregate_pending_periods": """
+            CREATE TABLE IF NOT EXISTS aggregate_pending_periods (
+                agg_table TEXT NOT NULL,
+                period DATE NOT NULL,
+                PRIMARY KEY (agg_table, period)
+            );
+        """,
+        "quarantine": """
+            CREATE TABLE IF NOT EXISTS quarantine (
+                tabel TEXT NOT NULL,
+                alasan TEXT NOT NULL,
+                record TEXT NOT NULL,
+                rejected_at TIMESTAMP NOT NULL,
+                record_hash TEXT
+            );
+        """,
+    }
+
+    engine = create_engine(SQL_ALCHEMY_DATABASE_URL)
+    registry = load_registry(engine)
+
+    # Deteksi drift: bandingkan kolom yang dideklarasikan dengan kolom aktual di database
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    declared_types = {name: declared_columns(sql) for name, sql in tables.items()}
+    actual = {
+        name: (dict.fromkeys(col["name"] for col in inspector.get_columns(name)) if name in existing_tables else None)
+        for name in tables
+    }
+    missing_tables = report_drift(
+        "operational", {name: dict.fromkeys(cols) for name, cols in declared_types.items()}, actual
+    )
+
+    # Migrasi aditif: kolom baru (nullable) yang belum ada di tabel lama ditambahkan dengan ALTER TABLE
+    with engine.begin() as connection:
+        for name, cols in declared_types.items():
+            if actual[name] is None:
+                continue
+            for col, column_type in cols.items():
+                if col not in actual[name]:
+                    connection.execute(text(f"ALTER TABLE {name} ADD COLUMN {col} {column_type}"))
+                    print(f"Kolom {col} ditambahkan ke tabel operasional {name}.")
+
+    pending = pending_ddl(registry, "operational", tables, missing_tables)
+    if not pending:
+        print("Skema database operasional tidak berubah, DDL dilewati.")
+    else:
+        with engine.begin() as connection:
+            for name, (sql, _) in pending.items():
+                connection.execute(text(sql))
+                print(f"Tabel operasional {name} berhasil dicek/dibuat.")
+        save_fingerprints(engine, {f"operational.{name}": fingerprint for name, (_, fingerprint) in pending.items()})
+
     print("Skema database operasional berhasil dibuat/diperbarui.")
+    migrate_legacy_review_ids(engine)
+    migrate_quarantine_record_hashes(engine)
 
-def load_data_if_new(df, table_name, engine, id_column, column_mapping=None, select_columns=None):
-    """Fungsi utilitas untuk membersihkan, seleksi kolom, dan menyimpan data baru ke tabel SQL."""
-    if df.empty:
-        print(f"Tidak ada data {table_name} dari GCS untuk diproses.")
+def migrate_legacy_review_ids(engine):
+    """Migrasi satu kali: mengganti id_review format lama (gabungan mentah place_id_author_url_timestamp)
+    dengan ID hash BLAKE2b. Pemetaan ID lama -> baru disimpan di tabel review_id_migration."""
+    legacy_ids_df = pd.read_sql_query(
+        "SELECT id_review FROM reviews WHERE id_review LIKE '%!_%' ESCAPE '!'", engine
+    )
+    if legacy_ids_df.empty:
         return
 
-    df = df.drop_duplicates(subset=[id_column])
+    df_mapping = pd.DataFrame({
+        'old_id_review': legacy_ids_df['id_review'],
+        'new_id_review': legacy_ids_df['id_review'].map(hash_review_key),
+    })
+    with engine.begin() as connection:
+        df_mapping.to_sql('review_id_migration', connection, if_exists='append', index=False)
+        # Review yang sudah ada dengan ID baru (diambil ulang setelah perubahan) cukup dihapus versi lamanya
+        connection.execute(text("""
+            DELETE FROM reviews WHERE id_review IN (
+                SELECT m.old_id_review FROM review_id_migration m
+                JOIN reviews r ON r.id_review = m.new_id_review
+            );
+        """))
+        connection.execute(text("""
+            UPDATE reviews SET id_review = (
+                SELECT m.new_id_review FROM review_id_migration m
+                WHERE m.old_id_review = reviews.id_review
+            )
+            WHERE id_review IN (SELECT old_id_review FROM review_id_migration);
+        """))
+    print(f"Berhasil memigrasikan {len(df_mapping)} id_review lama ke format hash.")
+
+def migrate_quarantine_record_hashes(engine):
+    """Mengisi record_hash untuk baris karantina lama (sekali jalan, duplikat lama dibuang), lalu
+    memastikan indeks unik (tabel, record_hash) yang dipakai insert-or-ignore di load_data_if_new."""
+    index_name = f"{QUARANTINE_TABLE}_record_uq"
+    if any(index["name"] == index_name for index in inspect(engine).get_indexes(QUARANTINE_TABLE)):
+        return
+    df_legacy = pd.read_sql_query(
+        f"SELECT tabel, alasan, record, rejected_at FROM {QUARANTINE_TABLE} WHERE record_hash IS NULL", engine
+    )
+    with engine.begin() as connection:
+        if not df_legacy.empty:
+            df_legacy['record_hash'] = record_hashes(df_legacy['record'])
+            df_legacy = df_legacy.drop_duplicates(subset=['tabel', 'record_hash'])
+            connection.execute(text(f"DELETE FROM {QUARANTINE_TABLE} WHERE record_hash IS NULL"))
+            df_legacy.to_sql(QUARANTINE_TABLE, connection, if_exists='append', index=False,
+                             method=insert_or_ignore)
+            print(f"record_hash diisi untuk {len(df_legacy)} record karantina lama.")
+        connection.execute(text(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} "
+            f"ON {QUARANTINE_TABLE} (tabel, record_hash)"
+        ))
+
+def insert_or_ignore(table, connection, keys, data_iter):
+    """Metode to_sql: INSERT yang melewati baris yang melanggar kunci unik (ON CONFLICT DO NOTHING /
+    INSERT IGNORE). Mengembalikan jumlah baris yang benar-benar disisipkan."""
+    from sqlalchemy import insert
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        statement = dialect_insert(table.table).on_conflict_do_nothing()
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table.table).on_conflict_do_nothing()
+    else:
+        statement = insert(table.table).prefix_with('IGNORE')
+    result = connection.execute(statement, [dict(zip(keys, row)) for row in data_iter])
+    return result.rowcount
+
+def load_data_if_new(df, table_name, engine, id_column, column_mapping=None, select_columns=None,
+                     timestamp_column=None):
+    """Fungsi utilitas untuk seleksi kolom, validasi, dan menyimpan data baru ke tabel SQL.
+    Validasi berjalan pada data staging mentah, sebelum rencana dtype (data/dtypes.py) diterapkan,
+    sehingga nilai yang tidak bisa diparsing (misal jumlah "1.500.000") dikarantina dengan nilai aslinya.
+    Baris yang ditolak validasi disimpan ke tabel quarantine. Jika timestamp_column diisi, periode
+    agregat yang tersentuh record baru dicatat sebagai pending dalam transaksi yang sama.
+    Mengembalikan DataFrame record yang baru dimuat (None jika tidak ada)."""
+    if df.empty:
+        print(f"Tidak ada data {table_name} dari GCS untuk diproses.")
+        return None
 
     # Rename kolom jika diperlukan
     if column_mapping:
@@ -105,58 +247,94 @@ def load_data_if_new(df, table_name, engine, id_column, column_mapping=None, sel
         df = df[[col for col in select_columns if col in df.columns]]
 
     try:
-        # Ambil ID yang sudah ada di database
-        existing_ids_df = pd.read_sql_query(f"SELECT {id_column} FROM {table_name}", engine)
-        existing_ids = set(existing_ids_df[id_column]) if not existing_ids_df.empty else set()
+        with stage("validate"):
+            df, df_rejected = validate(df, table_name)
+            if not df_rejected.empty:
+                # File staging dibaca ulang setiap run: record yang sudah dikarantina dilewati oleh
+                # indeks unik (tabel, record_hash), tanpa membaca isi tabel quarantine
+                df_rejected = df_rejected.assign(record_hash=record_hashes(df_rejected['record']))
+                inserted = df_rejected.to_sql(QUARANTINE_TABLE, engine, if_exists='append', index=False,
+                                              method=insert_or_ignore)
+                print(f"{len(df_rejected)} record {table_name} ditolak validasi, "
+                      f"{inserted or 0} baru dicatat ke {QUARANTINE_TABLE}.")
+            df = apply_dtype_plan(df, table_name)
+
+        with stage("dedup_existing_ids"):
+            # Ambil ID yang sudah ada di database
+            existing_ids_df = pd.read_sql_query(f"SELECT {id_column} FROM {table_name}", engine)
+            existing_ids = set(existing_ids_df[id_column]) if not existing_ids_df.empty else set()
 
-        # Filter data baru yang belum ada di database
-        df_new = df[~df[id_column].isin(existing_ids)]
+            # Filter data baru yang belum ada di database
+            df_new = df[~df[id_column].isin(existing_ids)]
 
         if not df_new.empty:
-            df_new.to_sql(table_name, engine, if_exists='append', index=False)
+            with stage("to_sql"), engine.begin() as connection:
+                df_new.to_sql(table_name, connection, if_exists='append', index=False)
+                if timestamp_column:
+                    record_pending_periods(connection, table_name, touched_dates(df_new, timestamp_column))
+                count(rows_out=len(df_new))
             print(f"Berhasil memuat {len(df_new)} record {table_name} baru ke database operasional.")
-        else:
-            print(f"Tidak ada record {table_name} baru untuk dimuat.")
+            return df_new
+        print(f"Tidak ada record {table_name} baru untuk dimuat.")
     except Exception as e:
         print(f"Error memuat {table_name} ke database operasional: {e}")
+    return None
 
+def touched_dates(df_new, timestamp_column: str) -> list:
+    """Daftar tanggal (YYYY-MM-DD, UTC) dari record yang baru dimuat, untuk refresh agregat inkremental."""
+    if df_new is None or df_new.empty:
+        return []
+    dates = pd.to_datetime(df_new[timestamp_column], utc=True).dropna().dt.strftime('%Y-%m-%d')
+    return sorted(dates.unique().tolist())
 
+
+@instrumented("transform_and_load_to_operational_db")
+@profiled
 def transform_and_load_to_operational_db():
-    """Mengambil data dari GCS, transformasi dasar, dan loading ke database operasional."""
+    """Mengambil data dari GCS, transformasi dasar, dan loading ke database operasional.
+    Tanggal record baru dicatat sebagai periode agregat pending (lihat data/aggregation.py)."""
     print("\n--- Memulai Transformasi dan Loading ke Database Operasional ---")
     engine = create_engine(SQL_ALCHEMY_DATABASE_URL)
 
     # --- PLACES ---
-    df_places = load_csv_from_gcs_to_df(GCS_BUCKET_NAME_API, GCS_PLACES_PREFIX)
-    load_data_if_new(
-        df_places, 'places', engine, 'place_id',
-        column_mapping={
-            'name_detail': 'name',
-            'types_detail': 'types',
-            'address_detail': 'address',
-            'lat_detail': 'lat',
-            'lng_detail': 'lng'
-        },
-        select_columns=[
-            'place_id', 'name', 'phone_number', 'opening_hours_text', 'types',
-            'lat', 'lng', 'rating_search'
-        ]
-    )
+    with stage("places"):
+        df_places = load_csv_from_gcs_to_df(GCS_BUCKET_NAME_API, GCS_PLACES_PREFIX, entity='places')
+        load_data_if_new(
+            df_places, 'places', engine, 'place_id',
+            column_mapping={
+                'name_detail': 'name',
+                'types_detail': 'types',
+                'address_detail': 'address',
+                'lat_detail': 'lat',
+                'lng_detail': 'lng'
+            },
+            select_columns=[
+                'place_id', 'name', 'phone_number', 'opening_hours_text', 'types',
+                'lat', 'lng', 'rating_search'
+            ]
+        )
 
     # --- REVIEWS ---
-    df_reviews = load_csv_from_gcs_to_df(GCS_BUCKET_NAME_API, GCS_REVIEWS_PREFIX)
-    load_data_if_new(df_reviews, 'reviews', engine, 'id_review')
+    with stage("reviews"):
+        df_reviews = load_csv_from_gcs_to_df(GCS_BUCKET_NAME_API, GCS_REVIEWS_PREFIX, entity='reviews')
+        if not df_reviews.empty:
+            # File staging lama di GCS masih memakai id_review format lama
+            df_reviews['id_review'] = normalize_review_ids(df_reviews['id_review'])
+        load_data_if_new(df_reviews, 'reviews', engine, 'id_review', timestamp_column='timestamp_review')
 
     # --- TWEETS ---
-    df_tweets = load_csv_from_gcs_to_df(GCS_BUCKET_NAME_API, GCS_TWEETS_PREFIX)
-    load_data_if_new(df_tweets, 'tweets', engine, 'id_tweet')
+    with stage("tweets"):
+        df_tweets = load_csv_from_gcs_to_df(GCS_BUCKET_NAME_API, GCS_TWEETS_PREFIX, entity='tweets')
+        load_data_if_new(df_tweets, 'tweets', engine, 'id_tweet', timestamp_column='created_at_tweet')
 
     # --- PEMASUKAN ---
-    df_pemasukan = load_csv_from_gcs_to_df(GCS_BUCKET_NAME_MANUAL, GCS_PEMASUKAN_PREFIX)
-    load_data_if_new(df_pemasukan, 'pemasukan', engine, 'id_transaksi_original')
+    with stage("pemasukan"):
+        df_pemasukan = load_csv_from_gcs_to_df(GCS_BUCKET_NAME_MANUAL, GCS_PEMASUKAN_PREFIX, entity='pemasukan')
+        load_data_if_new(df_pemasukan, 'pemasukan', engine, 'id_transaksi_original', timestamp_column='timestamp')
 
     # --- PENGELUARAN ---
-    df_pengeluaran = load_csv_from_gcs_to_df(GCS_BUCKET_NAME_MANUAL, GCS_PENGELUARAN_PREFIX)
-    load_data_if_new(df_pengeluaran, 'pengeluaran', engine, 'id_transaksi_original')
+    with stage("pengeluaran"):
+        df_pengeluaran = load_csv_from_gcs_to_df(GCS_BUCKET_NAME_MANUAL, GCS_PENGELUARAN_PREFIX, entity='pengeluaran')
+        load_data_if_new(df_pengeluaran, 'pengeluaran', engine, 'id_transaksi_original', timestamp_column='timestamp')
 
     print("Transformasi dan loading ke database operasional selesai.")
@@ -1,21 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
-from google.cloud import bigquery
 from sqlalchemy import create_engine
-from data.config import BIGQUERY_PROJECT_ID, BIGQUERY_DATASET_ID, SQL_ALCHEMY_DATABASE_URL
+from data.config import BIGQUERY_PROJECT_ID, BIGQUERY_DATASET_ID, SQL_ALCHEMY_DATABASE_URL, DIM_WAKTU_START_DATE, \
+    TWEET_PLACE_RADIUS_KM
+from data.instrumentation import instrumented, stage, count
+from data.profiling import profiled
+from data.dtypes import apply_dtype_plan
+from data.bigquery_schema import DATA_MART_COLUMNS
+from data.dim_waktu import build_calendar, missing_calendar_ranges, waktu_keys
+from data.spatial_index import PlaceGridIndex
+from data.schema_registry import load_registry, save_fingerprints, pending_ddl, report_drift
+from data.validation import validate, QUARANTINE_TABLE
+from data.aggregation import AGGREGATES
+
+# Tabel staging untuk MERGE karantina (lihat merge_quarantine)
+QUARANTINE_STAGING_TABLE = "quarantine_staging"
 
+@instrumented("create_bigquery_tables_for_data_mart")
+@profiled
 def create_bigquery_tables_for_data_mart():
     """Membuat tabel data mart sesuai desain fisik pada BigQuery."""
+    from google.cloud import bigquery
     bigquery_client = bigquery.Client(project=BIGQUERY_PROJECT_ID)
     tables = {
         # Dimensi
         "dim_waktu": f"""
             CREATE TABLE IF NOT EXISTS `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.dim_waktu` (
-                timestamp_datetime TIMESTAMP NOT NULL,
+                id_waktu INT64 NOT NULL,
+                tanggal DATE NOT NULL,
                 jam TIME NOT NULL,
                 hari STRING NOT NULL,
-                tanggal DATE NOT NULL,
                 bulan STRING NOT NULL,
-                tahun INT64 NOT NULL
+                tahun INT64 NOT NULL,
+                PRIMARY KEY(id_waktu)
             );
         """,
         "dim_place": f"""
@@ -72,6 +90,7 @@ def create_bigquery_tables_for_data_mart():
             CREATE TABLE IF NOT EXISTS `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.fact_maps` (
                 id_review STRING NOT NULL,
                 timestamp_datetime TIMESTAMP NOT NULL,
+                id_waktu INT64 NOT NULL,
                 place_id STRING NOT NULL,
                 author_url STRING NOT NULL,
                 review_longtext STRING NOT NULL,
@@ -83,9 +102,13 @@ def create_bigquery_tables_for_data_mart():
             CREATE TABLE IF NOT EXISTS `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.fact_twitter` (
                 id_tweet STRING NOT NULL,
                 created_at_datetime TIMESTAMP NOT NULL,
+                id_waktu INT64 NOT NULL,
+                place_id STRING NOT NULL,
                 id_user STRING NOT NULL,
                 nama_lokasi STRING NOT NULL,
                 text_tweet STRING NOT NULL,
+                place_id_geo STRING,
+                jarak_place_km FLOAT64,
                 PRIMARY KEY(id_tweet)
             );
         """,
@@ -93,6 +116,7 @@ def create_bigquery_tables_for_data_mart():
             CREATE TABLE IF NOT EXISTS `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.fact_pengeluaran` (
                 id_transaksi STRING NOT NULL,
                 timestamp_datetime TIMESTAMP NOT NULL,
+                id_waktu INT64 NOT NULL,
                 jenis_kebutuhan STRING NOT NULL,
                 id_vendor STRING NOT NULL,
                 id_departemen STRING NOT NULL,
@@ -106,6 +130,7 @@ def create_bigquery_tables_for_data_mart():
             CREATE TABLE IF NOT EXISTS `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.fact_pemasukan` (
                 id_transaksi_income STRING NOT NULL,
                 timestamp_datetime TIMESTAMP NOT NULL,
+                id_waktu INT64 NOT NULL,
                 jenis_pemasukan STRING NOT NULL,
                 id_penyumbang STRING NOT NULL,
                 jumlah_pemasukan BIGNUMERIC NOT NULL,
@@ -113,57 +138,244 @@ def create_bigquery_tables_for_data_mart():
                 id_proyek STRING NOT NULL,
                 PRIMARY KEY(id_transaksi_income)
             );
+        """,
+        # Agregat untuk dashboard (diperbarui inkremental oleh refresh_data_mart_aggregates)
+        "agg_maps_harian": f"""
+            CREATE TABLE IF NOT EXISTS `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.agg_maps_harian` (
+                tanggal DATE NOT NULL,
+                place_id STRING NOT NULL,
+                jumlah_review INT64 NOT NULL,
+                rata_rata_rating FLOAT64 NOT NULL
+            )
+            PARTITION BY tanggal
+            CLUSTER BY place_id;
+        """,
+        "agg_twitter_harian": f"""
+            CREATE TABLE IF NOT EXISTS `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.agg_twitter_harian` (
+                tanggal DATE NOT NULL,
+                place_id STRING NOT NULL,
+                nama_lokasi STRING NOT NULL,
+                jumlah_tweet INT64 NOT NULL
+            )
+            PARTITION BY tanggal
+            CLUSTER BY place_id;
+        """,
+        "agg_keuangan_bulanan": f"""
+            CREATE TABLE IF NOT EXISTS `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.agg_keuangan_bulanan` (
+                bulan DATE NOT NULL,
+                id_proyek STRING NOT NULL,
+                sektor_pariwisata STRING,
+                total_pemasukan BIGNUMERIC NOT NULL,
+                total_pengeluaran BIGNUMERIC NOT NULL
+            )
+            CLUSTER BY id_proyek, sektor_pariwisata;
+        """,
+        # Tabel samping hasil enrichment teks (data/text_enrichment.py)
+        "enrich_maps": f"""
+            CREATE TABLE IF NOT EXISTS `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.enrich_maps` (
+                id_review STRING NOT NULL,
+                teks_normal STRING,
+                kata_kunci STRING,
+                skor_sentimen FLOAT64,
+                PRIMARY KEY(id_review)
+            );
+        """,
+        "enrich_twitter": f"""
+            CREATE TABLE IF NOT EXISTS `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.enrich_twitter` (
+                id_tweet STRING NOT NULL,
+                teks_normal STRING,
+                kata_kunci STRING,
+                skor_sentimen FLOAT64,
+                PRIMARY KEY(id_tweet)
+            );
+        """,
+        # Baris yang ditolak validasi (data/validation.py), beserta alasannya
+        "quarantine": f"""
+            CREATE TABLE IF NOT EXISTS `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.quarantine` (
+                tabel STRING NOT NULL,
+                alasan STRING NOT NULL,
+                record STRING NOT NULL,
+                rejected_at TIMESTAMP NOT NULL
+            )
+            PARTITION BY DATE(rejected_at)
+            CLUSTER BY tabel;
         """
     }
-    for name, sql in tables.items():
-        bigquery_client.query(sql).result()
+    engine = create_engine(SQL_ALCHEMY_DATABASE_URL)
+    registry = load_registry(engine)
+
+    # Deteksi drift: bandingkan skema yang dideklarasikan dengan skema aktual di BigQuery
+    with stage("drift_check"):
+        declared = {
+            name: {col: field_type for col, field_type, _ in DATA_MART_COLUMNS[name]}
+            for name in tables
+        }
+        actual = fetch_bigquery_table_schemas(bigquery_client, tables)
+        missing_tables = report_drift("bigquery", declared, actual)
+        # Tabel agregat bisa dihitung ulang penuh dari tabel fakta: jika kolomnya berubah, tabel dibuang
+        # dan dibuat ulang, lalu refresh_data_mart_aggregates mengisinya kembali dari seluruh histori
+        rebuilt_tables = {
+            name for name in AGGREGATES
+            if actual.get(name) is not None and actual[name].keys() != declared[name].keys()
+        }
+
+    pending = pending_ddl(registry, "bigquery", tables, missing_tables | rebuilt_tables)
+    for name in rebuilt_tables:
+        sql, fingerprint = pending[name]
+        drop_sql = f"DROP TABLE IF EXISTS `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.{name}`;"
+        pending[name] = (f"{drop_sql}\n{sql}", fingerprint)
+        print(f"Skema agregat {name} berubah, tabel dibuat ulang dan dihitung ulang penuh.")
+    if not pending:
+        print("Skema data mart BigQuery tidak berubah, DDL dilewati.")
+        return
+
+    # Semua DDL yang perlu dijalankan dikirim sebagai satu skrip multi-statement (satu job)
+    with stage("ddl_script"):
+        bigquery_client.query("\n".join(sql for sql, _ in pending.values())).result()
+    save_fingerprints(engine, {f"bigquery.{name}": fingerprint for name, (_, fingerprint) in pending.items()})
+    for name in pending:
         print(f"Tabel {name} berhasil dicek/dibuat di BigQuery.")
 
+# Nama tipe legacy yang dikembalikan API tabel BigQuery -> nama tipe standar SQL di DDL
+_LEGACY_BIGQUERY_TYPES = {"INTEGER": "INT64", "FLOAT": "FLOAT64", "BOOLEAN": "BOOL"}
+
+def fetch_bigquery_table_schemas(bigquery_client, table_names) -> dict:
+    """Mengambil skema aktual tabel data mart secara paralel (panggilan metadata, bukan query job).
+    Mengembalikan {tabel: {kolom: tipe}} atau None untuk tabel yang belum ada."""
+    from google.api_core.exceptions import NotFound
+
+    def fetch(name):
+        try:
+            table = bigquery_client.get_table(f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.{name}")
+        except NotFound:
+            return name, None
+        return name, {
+            field.name: _LEGACY_BIGQUERY_TYPES.get(field.field_type, field.field_type)
+            for field in table.schema
+        }
+
+    with ThreadPoolExecutor(max_workers=len(table_names)) as executor:
+        return dict(executor.map(fetch, table_names))
+
+def read_operational_table(table_name: str, engine) -> pd.DataFrame:
+    """Membaca tabel dari database operasional dengan rencana dtype ringkas (data/dtypes.py).
+    Kolom timestamp sengaja tidak diparsing saat membaca: baris lama tersimpan sebagai string ISO
+    (2023-11-14T22:13:20+00:00) dan baris baru sebagai '2023-11-15 22:13:20.000000'; read_sql_table
+    menebak satu format per kolom sehingga format lainnya menjadi NaT. Parsing ISO8601 di rencana
+    dtype menangani keduanya."""
+    return apply_dtype_plan(pd.read_sql_query(f"SELECT * FROM {table_name}", engine), table_name)
+
+def load_df_to_bigquery(bigquery_client, df: pd.DataFrame, table_name: str, write_disposition: str = "WRITE_TRUNCATE"):
+    """Memuat DataFrame ke tabel data mart BigQuery lewat Parquet terkompresi dengan skema eksplisit,
+    lalu mencatat jumlah baris serta byte yang diunggah."""
+    from data.bigquery_schema import df_to_parquet_buffer, parquet_load_job_config
+    with stage(f"load_{table_name}"):
+        with stage("to_parquet"):
+            parquet_buffer = df_to_parquet_buffer(df, table_name)
+        job_config = parquet_load_job_config(table_name, write_disposition)
+        table_id = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.{table_name}"
+        load_job = bigquery_client.load_table_from_file(parquet_buffer, table_id, job_config=job_config)
+        load_job.result()
+        count(rows_out=len(df), bytes=parquet_buffer.getbuffer().nbytes)
+    print(f"Berhasil memuat {len(df)} record ke {table_name}.")
+
+def merge_quarantine(bigquery_client, df_quarantine: pd.DataFrame):
+    """Mencatat baris yang ditolak validasi ke tabel quarantine BigQuery lewat tabel staging + MERGE.
+    Tabel operasional dibaca dan divalidasi ulang setiap run; record yang sudah pernah dikarantina
+    untuk tabel yang sama tidak dicatat ulang."""
+    dataset = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}"
+    load_df_to_bigquery(bigquery_client, df_quarantine, QUARANTINE_STAGING_TABLE)
+    with stage("merge_quarantine"):
+        query_job = bigquery_client.query(f"""
+            MERGE `{dataset}.{QUARANTINE_TABLE}` AS q
+            USING (
+                SELECT * FROM `{dataset}.{QUARANTINE_STAGING_TABLE}`
+                WHERE TRUE
+                QUALIFY ROW_NUMBER() OVER (PARTITION BY tabel, record) = 1
+            ) AS s
+            ON q.tabel = s.tabel AND q.record = s.record
+            WHEN NOT MATCHED THEN
+                INSERT (tabel, alasan, record, rejected_at) VALUES (s.tabel, s.alasan, s.record, s.rejected_at)
+        """)
+        query_job.result()
+        count(bytes=query_job.total_bytes_processed or 0)
+    print(f"{query_job.num_dml_affected_rows or 0} dari {len(df_quarantine)} record yang ditolak "
+          f"baru dicatat ke {QUARANTINE_TABLE} (sisanya sudah dikarantina sebelumnya).")
+
+def fetch_dim_waktu_key_range(bigquery_client):
+    """Rentang id_waktu (min, max) yang sudah ada di dim_waktu; (None, None) jika tabel kosong,
+    None jika tabel belum ada atau masih memakai skema lama tanpa id_waktu."""
+    from google.api_core.exceptions import BadRequest, NotFound
+
+    sql = f"SELECT MIN(id_waktu) AS min_key, MAX(id_waktu) AS max_key FROM `{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.dim_waktu`"
+    try:
+        row = next(iter(bigquery_client.query(sql).result()))
+    except (BadRequest, NotFound):
+        return None
+    return row.min_key, row.max_key
+
+@instrumented("transform_and_load_to_bigquery_data_mart")
+@profiled
 def transform_and_load_to_bigquery_data_mart():
+    from google.cloud import bigquery
     print("--- Transformasi dan Load ke Data Mart BigQuery ---")
     engine = create_engine(SQL_ALCHEMY_DATABASE_URL)
     bigquery_client = bigquery.Client(project=BIGQUERY_PROJECT_ID)
+    quarantined = []
+
+    def validate_and_load(df, table_name):
+        """Validasi satu tabel data mart (data/validation.py), baris yang ditolak dikumpulkan
+        untuk tabel karantina, baris bersih dimuat ke BigQuery."""
+        with stage(f"validate_{table_name}"):
+            df_clean, df_rejected = validate(df, table_name)
+        if not df_rejected.empty:
+            quarantined.append(df_rejected)
+        load_df_to_bigquery(bigquery_client, df_clean, table_name)
 
     # --------- DIMENSI ---------
-    # Dimensi Waktu (gabung semua timestamp dari tabel operasional)
+    # Dimensi Waktu (kalender per jam dengan surrogate key id_waktu = YYYYMMDDHH)
     print("Memuat dim_waktu ...")
-    df_reviews_op = pd.read_sql_table('reviews', engine)
-    df_tweets_op = pd.read_sql_table('tweets', engine)
-    df_pemasukan_op = pd.read_sql_table('pemasukan', engine)
-    df_pengeluaran_op = pd.read_sql_table('pengeluaran', engine)
+    with stage("read_operational_tables"):
+        df_reviews_op = read_operational_table('reviews', engine)
+        df_tweets_op = read_operational_table('tweets', engine)
+        df_pemasukan_op = read_operational_table('pemasukan', engine)
+        df_pengeluaran_op = read_operational_table('pengeluaran', engine)
+        count(rows_in=len(df_reviews_op) + len(df_tweets_op) + len(df_pemasukan_op) + len(df_pengeluaran_op))
 
-    all_timestamps = pd.Series(dtype='datetime64[ns]')
+    # Kalender per jam hanya dibangun/diperluas untuk tanggal yang belum ada di dim_waktu
+    required_start = pd.Timestamp(DIM_WAKTU_START_DATE, tz='UTC')
+    required_end = pd.Timestamp.now(tz='UTC')
     for df, col in [
         (df_reviews_op, 'timestamp_review'),
         (df_tweets_op, 'created_at_tweet'),
         (df_pemasukan_op, 'timestamp'),
         (df_pengeluaran_op, 'timestamp'),
     ]:
-        if not df.empty:
-            all_timestamps = pd.concat([all_timestamps, pd.to_datetime(df[col])])
-    all_timestamps = all_timestamps.dropna().unique()
-    df_dim_waktu = pd.DataFrame({'timestamp_datetime': pd.to_datetime(all_timestamps)})
-    if not df_dim_waktu.empty:
-        df_dim_waktu['jam'] = df_dim_waktu['timestamp_datetime'].dt.time
-        df_dim_waktu['hari'] = df_dim_waktu['timestamp_datetime'].dt.day_name()
-        df_dim_waktu['tanggal'] = df_dim_waktu['timestamp_datetime'].dt.date
-        df_dim_waktu['bulan'] = df_dim_waktu['timestamp_datetime'].dt.strftime('%Y-%m')
-        df_dim_waktu['tahun'] = df_dim_waktu['timestamp_datetime'].dt.year
-        # Semua NOT NULL
-        df_dim_waktu = df_dim_waktu.dropna()
-        job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-        table_id = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.dim_waktu"
-        bigquery_client.load_table_from_dataframe(df_dim_waktu, table_id, job_config=job_config).result()
-        print(f"Berhasil memuat {len(df_dim_waktu)} record ke dim_waktu.")
+        if not df.empty and df[col].notna().any():
+            required_start = min(required_start, df[col].min())
+            required_end = max(required_end, df[col].max())
+
+    existing_key_range = fetch_dim_waktu_key_range(bigquery_client)
+    if existing_key_range is None:
+        # dim_waktu belum memakai id_waktu (skema lama): bangun ulang seluruh kalender
+        calendar_ranges = [(required_start, required_end)]
+        write_disposition = "WRITE_TRUNCATE"
+    else:
+        calendar_ranges = missing_calendar_ranges(*existing_key_range, required_start, required_end)
+        write_disposition = "WRITE_APPEND"
+    if calendar_ranges:
+        df_dim_waktu = pd.concat([build_calendar(start, end) for start, end in calendar_ranges], ignore_index=True)
+        load_df_to_bigquery(bigquery_client, df_dim_waktu, 'dim_waktu', write_disposition=write_disposition)
+    else:
+        print("dim_waktu sudah mencakup seluruh rentang tanggal, tidak ada baris baru.")
 
     # Dimensi Place
     print("Memuat dim_place ...")
-    df_places_op = pd.read_sql_table('places', engine)
+    df_places_op = read_operational_table('places', engine)
     if not df_places_op.empty:
         df_dim_place = df_places_op[[
             'place_id', 'name', 'lat', 'lng', 'types', 'phone_number', 'opening_hours_text'
-        ]].copy()
-        df_dim_place = df_dim_place.rename(columns={
+        ]].rename(columns={
             'name': 'nama_tempat',
             'lat': 'latitude',
             'lng': 'longitude',
@@ -171,121 +383,85 @@ def transform_and_load_to_bigquery_data_mart():
             'phone_number': 'kontak',
             'opening_hours_text': 'jam_operasional'
         })
-        # Semua field NOT NULL kecuali kontak, jam_operasional
-        df_dim_place = df_dim_place.dropna(subset=[
-            'place_id', 'nama_tempat', 'latitude', 'longitude', 'tipe_tempat'
-        ])
-        df_dim_place = df_dim_place.drop_duplicates(subset=['place_id'])
-        job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-        table_id = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.dim_place"
-        bigquery_client.load_table_from_dataframe(df_dim_place, table_id, job_config=job_config).result()
-        print(f"Berhasil memuat {len(df_dim_place)} record ke dim_place.")
+        validate_and_load(df_dim_place, 'dim_place')
 
     # Dimensi User (Twitter)
     print("Memuat dim_user ...")
     if not df_tweets_op.empty:
-        df_dim_user = df_tweets_op[['id_author_twitter', 'author_location']].copy()
-        df_dim_user = df_dim_user.rename(columns={
+        df_dim_user = df_tweets_op[['id_author_twitter', 'author_location']].rename(columns={
             'id_author_twitter': 'id_user',
             'author_location': 'lokasi_user'
         })
-        df_dim_user = df_dim_user.drop_duplicates(subset=['id_user'])
-        df_dim_user = df_dim_user.dropna(subset=['id_user'])
-        job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-        table_id = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.dim_user"
-        bigquery_client.load_table_from_dataframe(df_dim_user, table_id, job_config=job_config).result()
-        print(f"Berhasil memuat {len(df_dim_user)} record ke dim_user.")
+        validate_and_load(df_dim_user, 'dim_user')
 
     # Dimensi Vendor
     print("Memuat dim_vendor ...")
     if not df_pengeluaran_op.empty:
-        df_dim_vendor = df_pengeluaran_op[['id_vendor', 'nama_vendor']].copy()
-        df_dim_vendor = df_dim_vendor.drop_duplicates(subset=['id_vendor'])
-        df_dim_vendor = df_dim_vendor.dropna(subset=['id_vendor', 'nama_vendor'])
-        job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-        table_id = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.dim_vendor"
-        bigquery_client.load_table_from_dataframe(df_dim_vendor, table_id, job_config=job_config).result()
-        print(f"Berhasil memuat {len(df_dim_vendor)} record ke dim_vendor.")
+        validate_and_load(df_pengeluaran_op[['id_vendor', 'nama_vendor']], 'dim_vendor')
 
     # Dimensi Departemen
     print("Memuat dim_departemen ...")
     if not df_pengeluaran_op.empty:
-        df_dim_departemen = df_pengeluaran_op[['id_departemen', 'nama_departemen']].copy()
-        df_dim_departemen = df_dim_departemen.drop_duplicates(subset=['id_departemen'])
-        df_dim_departemen = df_dim_departemen.dropna(subset=['id_departemen', 'nama_departemen'])
-        job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-        table_id = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.dim_departemen"
-        bigquery_client.load_table_from_dataframe(df_dim_departemen, table_id, job_config=job_config).result()
-        print(f"Berhasil memuat {len(df_dim_departemen)} record ke dim_departemen.")
+        validate_and_load(df_pengeluaran_op[['id_departemen', 'nama_departemen']], 'dim_departemen')
 
     # Dimensi Proyek
     print("Memuat dim_proyek ...")
     df_dim_proyek = pd.concat([
         df_pemasukan_op[['id_proyek', 'nama_proyek', 'sektor_pariwisata']],
         df_pengeluaran_op[['id_proyek', 'nama_proyek', 'sektor_pariwisata']]
-    ]).drop_duplicates(subset=['id_proyek'])
-    df_dim_proyek = df_dim_proyek.dropna(subset=['id_proyek', 'nama_proyek', 'sektor_pariwisata'])
-    if not df_dim_proyek.empty:
-        job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-        table_id = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.dim_proyek"
-        bigquery_client.load_table_from_dataframe(df_dim_proyek, table_id, job_config=job_config).result()
-        print(f"Berhasil memuat {len(df_dim_proyek)} record ke dim_proyek.")
+    ], ignore_index=True)
+    validate_and_load(df_dim_proyek, 'dim_proyek')
 
     # Dimensi Penyumbang
     print("Memuat dim_penyumbang ...")
     if not df_pemasukan_op.empty:
-        df_dim_penyumbang = df_pemasukan_op[['id_penyumbang', 'nama_penyumbang', 'jenis_penyumbang']].copy()
-        df_dim_penyumbang = df_dim_penyumbang.drop_duplicates(subset=['id_penyumbang'])
-        df_dim_penyumbang = df_dim_penyumbang.dropna(subset=['id_penyumbang', 'nama_penyumbang', 'jenis_penyumbang'])
-        job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-        table_id = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.dim_penyumbang"
-        bigquery_client.load_table_from_dataframe(df_dim_penyumbang, table_id, job_config=job_config).result()
-        print(f"Berhasil memuat {len(df_dim_penyumbang)} record ke dim_penyumbang.")
+        validate_and_load(
+            df_pemasukan_op[['id_penyumbang', 'nama_penyumbang', 'jenis_penyumbang']], 'dim_penyumbang'
+        )
 
     # --------- FAKTA ---------
     # fact_maps
     print("Memuat fact_maps ...")
     if not df_reviews_op.empty:
-        df_fact_maps = df_reviews_op[['id_review', 'timestamp_review', 'place_id', 'author_url', 'review_text', 'rating']].copy()
-        df_fact_maps = df_fact_maps.rename(columns={
+        df_fact_maps = df_reviews_op[[
+            'id_review', 'timestamp_review', 'place_id', 'author_url', 'review_text', 'rating'
+        ]].rename(columns={
             'timestamp_review': 'timestamp_datetime',
             'review_text': 'review_longtext'
         })
-        df_fact_maps = df_fact_maps.dropna(subset=[
-            'id_review', 'timestamp_datetime', 'place_id', 'author_url', 'review_longtext', 'rating'
-        ])
-        job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-        table_id = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.fact_maps"
-        bigquery_client.load_table_from_dataframe(df_fact_maps, table_id, job_config=job_config).result()
-        print(f"Berhasil memuat {len(df_fact_maps)} record ke fact_maps.")
+        df_fact_maps['id_waktu'] = waktu_keys(df_fact_maps['timestamp_datetime'])
+        validate_and_load(df_fact_maps, 'fact_maps')
 
     # fact_twitter
     print("Memuat fact_twitter ...")
     if not df_tweets_op.empty:
-        df_places_op = pd.read_sql_table('places', engine)
         df_fact_twitter = df_tweets_op.merge(
             df_places_op[['place_id', 'name']],
             left_on='place_id_source',
             right_on='place_id',
             how='left'
         )
-        df_fact_twitter = df_fact_twitter.rename(columns={
+        df_fact_twitter = df_fact_twitter.drop(columns=['place_id']).rename(columns={
             'created_at_tweet': 'created_at_datetime',
+            'place_id_source': 'place_id',
             'name': 'nama_lokasi'
         })
+        # Atribusi spasial: tweet berkoordinat -> tempat wisata terdekat dalam radius (indeks grid)
+        with stage("spatial_attribution"):
+            place_index = PlaceGridIndex(df_places_op, TWEET_PLACE_RADIUS_KM)
+            df_nearest = place_index.nearest(df_fact_twitter['tweet_lat'], df_fact_twitter['tweet_lng'])
+            df_fact_twitter['place_id_geo'] = df_nearest['place_id']
+            df_fact_twitter['jarak_place_km'] = df_nearest['jarak_km']
+        print(f"{df_fact_twitter['place_id_geo'].notna().sum()} tweet diatribusikan ke tempat terdekat "
+              f"dalam radius {TWEET_PLACE_RADIUS_KM} km.")
         df_fact_twitter_final = df_fact_twitter[[
-            'id_tweet', 'created_at_datetime', 'id_author_twitter', 'nama_lokasi', 'text_tweet'
-        ]].copy()
-        df_fact_twitter_final = df_fact_twitter_final.rename(columns={
+            'id_tweet', 'created_at_datetime', 'place_id', 'id_author_twitter', 'nama_lokasi', 'text_tweet',
+            'place_id_geo', 'jarak_place_km'
+        ]].rename(columns={
             'id_author_twitter': 'id_user'
         })
-        df_fact_twitter_final = df_fact_twitter_final.dropna(subset=[
-            'id_tweet', 'created_at_datetime', 'id_user', 'nama_lokasi', 'text_tweet'
-        ])
-        job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-        table_id = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.fact_twitter"
-        bigquery_client.load_table_from_dataframe(df_fact_twitter_final, table_id, job_config=job_config).result()
-        print(f"Berhasil memuat {len(df_fact_twitter_final)} record ke fact_twitter.")
+        df_fact_twitter_final['id_waktu'] = waktu_keys(df_fact_twitter_final['created_at_datetime'])
+        validate_and_load(df_fact_twitter_final, 'fact_twitter')
 
     # fact_pengeluaran
     print("Memuat fact_pengeluaran ...")
@@ -293,21 +469,14 @@ def transform_and_load_to_bigquery_data_mart():
         df_fact_pengeluaran = df_pengeluaran_op[[
             'id_transaksi_original', 'timestamp', 'jenis_kebutuhan', 'id_vendor',
             'id_departemen', 'jumlah', 'bukti', 'id_proyek'
-        ]].copy()
-        df_fact_pengeluaran = df_fact_pengeluaran.rename(columns={
+        ]].rename(columns={
             'id_transaksi_original': 'id_transaksi',
             'timestamp': 'timestamp_datetime',
             'jumlah': 'jumlah_pengeluaran',
             'bukti': 'bukti_pengeluaran'
         })
-        df_fact_pengeluaran = df_fact_pengeluaran.dropna(subset=[
-            'id_transaksi', 'timestamp_datetime', 'jenis_kebutuhan',
-            'id_vendor', 'id_departemen', 'jumlah_pengeluaran', 'id_proyek'
-        ])
-        job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-        table_id = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.fact_pengeluaran"
-        bigquery_client.load_table_from_dataframe(df_fact_pengeluaran, table_id, job_config=job_config).result()
-        print(f"Berhasil memuat {len(df_fact_pengeluaran)} record ke fact_pengeluaran.")
+        df_fact_pengeluaran['id_waktu'] = waktu_keys(df_fact_pengeluaran['timestamp_datetime'])
+        validate_and_load(df_fact_pengeluaran, 'fact_pengeluaran')
 
     # fact_pemasukan
     print("Memuat fact_pemasukan ...")
@@ -315,20 +484,19 @@ def transform_and_load_to_bigquery_data_mart():
         df_fact_pemasukan = df_pemasukan_op[[
             'id_transaksi_original', 'timestamp', 'jenis_pemasukan', 'id_penyumbang',
             'jumlah', 'bukti', 'id_proyek'
-        ]].copy()
-        df_fact_pemasukan = df_fact_pemasukan.rename(columns={
+        ]].rename(columns={
             'id_transaksi_original': 'id_transaksi_income',
             'timestamp': 'timestamp_datetime',
             'jumlah': 'jumlah_pemasukan',
             'bukti': 'bukti_pemasukan'
         })
-        df_fact_pemasukan = df_fact_pemasukan.dropna(subset=[
-            'id_transaksi_income', 'timestamp_datetime', 'jenis_pemasukan',
-            'id_penyumbang', 'jumlah_pemasukan', 'id_proyek'
-        ])
-        job_config = bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-        table_id = f"{BIGQUERY_PROJECT_ID}.{BIGQUERY_DATASET_ID}.fact_pemasukan"
-        bigquery_client.load_table_from_dataframe(df_fact_pemasukan, table_id, job_config=job_config).result()
-        print(f"Berhasil memuat {len(df_fact_pemasukan)} record ke fact_pemasukan.")
+        df_fact_pemasukan['id_waktu'] = waktu_keys(df_fact_pemasukan['timestamp_datetime'])
+        validate_and_load(df_fact_pemasukan, 'fact_pemasukan')
+
+    # --------- KARANTINA ---------
+    if quarantined:
+        merge_quarantine(bigquery_client, pd.concat(quarantined, ignore_index=True))
+    else:
+        print("Semua baris lolos validasi, tidak ada baris yang dikarantina.")
 
     print("--- Selesai ---")
@@ -1,7 +1,10 @@
 import pandas as pd
 from datetime import datetime, timezone
-from google.cloud import storage
 import io
+import hashlib
+
+from data.instrumentation import count
+from data.dtypes import csv_read_dtypes
 
 def save_df_to_gcs(df: pd.DataFrame, gcs_bucket_name: str, gcs_prefix: str, base_file_name: str):
     """Menyimpan DataFrame ke GCS sebagai file CSV."""
@@ -9,6 +12,7 @@ def save_df_to_gcs(df: pd.DataFrame, gcs_bucket_name: str, gcs_prefix: str, base
         print(f"DataFrame untuk {base_file_name} kosong, tidak ada yang disimpan ke GCS.")
         return
 
+    from google.cloud import storage
     storage_client = storage.Client()
     bucket = storage_client.bucket(gcs_bucket_name)
 
@@ -18,15 +22,22 @@ def save_df_to_gcs(df: pd.DataFrame, gcs_bucket_name: str, gcs_prefix: str, base
     try:
         csv_buffer = io.StringIO()
         df.to_csv(csv_buffer, index=False)
+        csv_payload = csv_buffer.getvalue()
         blob = bucket.blob(file_name)
-        blob.upload_from_string(csv_buffer.getvalue(), content_type='text/csv')
+        blob.upload_from_string(csv_payload, content_type='text/csv')
+        count(rows_out=len(df), bytes=len(csv_payload.encode('utf-8')))
         print(f"DataFrame '{base_file_name}' berhasil disimpan ke GCS: gs://{gcs_bucket_name}/{file_name}")
         csv_buffer.close()
     except Exception as e:
         print(f"Error menyimpan DataFrame '{base_file_name}' ke GCS: {e}")
 
-def load_csv_from_gcs_to_df(gcs_bucket_name: str, gcs_prefix: str) -> pd.DataFrame:
-    """Membaca semua file CSV dari prefix GCS tertentu dan mengembalikan DataFrame gabungan."""
+def load_csv_from_gcs_to_df(gcs_bucket_name: str, gcs_prefix: str, entity: str = None) -> pd.DataFrame:
+    """Membaca semua file CSV dari prefix GCS tertentu dan mengembalikan DataFrame gabungan.
+    Jika entity diberikan, kolom teks/ID entitas dibaca sebagai string (csv_read_dtypes). Kolom angka
+    dan waktu dibiarkan mentah: rencana dtype baru diterapkan setelah validasi (load_data_if_new),
+    agar nilai yang tidak bisa diparsing ditolak aturan validasi, bukan diam-diam menjadi NA."""
+    from google.cloud import storage
+    read_dtypes = csv_read_dtypes(entity) if entity else None
     storage_client = storage.Client()
     bucket = storage_client.bucket(gcs_bucket_name)
     blobs = bucket.list_blobs(prefix=gcs_prefix)
@@ -35,7 +46,8 @@ def load_csv_from_gcs_to_df(gcs_bucket_name: str, gcs_prefix: str) -> pd.DataFra
         if blob.name.endswith('.csv'):
             try:
                 csv_data = blob.download_as_text()
-                df = pd.read_csv(io.StringIO(csv_data))
+                df = pd.read_csv(io.StringIO(csv_data), dtype=read_dtypes)
+                count(rows_in=len(df), bytes=len(csv_data.encode('utf-8')))
                 all_dfs.append(df)
                 print(f"Berhasil membaca {blob.name} dari GCS.")
             except Exception as e:
@@ -43,3 +55,18 @@ def load_csv_from_gcs_to_df(gcs_bucket_name: str, gcs_prefix: str) -> pd.DataFra
     if all_dfs:
         return pd.concat(all_dfs, ignore_index=True)
     return pd.DataFrame()
+
+REVIEW_ID_DIGEST_SIZE = 16
+
+def hash_review_key(raw_key: str) -> str:
+    """Mengubah kunci review mentah (place_id_author_url_timestamp) menjadi ID tetap 32 karakter
+    hex (BLAKE2b 16 byte). Deterministik, sehingga review yang sama selalu mendapat ID yang sama."""
+    return hashlib.blake2b(raw_key.encode("utf-8"), digest_size=REVIEW_ID_DIGEST_SIZE).hexdigest()
+
+def normalize_review_ids(ids: pd.Series) -> pd.Series:
+    """Mengganti ID review format lama (gabungan mentah, selalu mengandung '_') dengan ID hash.
+    ID yang sudah berupa hash dibiarkan apa adanya."""
+    legacy_mask = ids.astype("string").str.contains("_", regex=False).fillna(False).astype(bool)
+    if not legacy_mask.any():
+        return ids
+    return ids.mask(legacy_mask, ids[legacy_mask].map(hash_review_key))
@@ -0,0 +1,178 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from data.bigquery_schema import DATA_MART_COLUMNS
+from data.instrumentation import count, REJECT_COUNTER_PREFIX
+
+QUARANTINE_TABLE = "quarantine"
+QUARANTINE_COLUMNS = ["tabel", "alasan", "record", "rejected_at"]
+
+_NUMERIC_BIGQUERY_TYPES = ("INT64", "FLOAT64", "BIGNUMERIC")
+
+
+def record_hashes(records: pd.Series) -> pd.Series:
+    """Hash record karantina (BLAKE2b 16 byte, hex) untuk indeks unik (tabel, record_hash),
+    sehingga record yang sama tidak perlu dibandingkan lewat teks JSON lengkapnya."""
+    return records.map(lambda record: hashlib.blake2b(record.encode("utf-8"), digest_size=16).hexdigest())
+
+
+def _data_mart_rules(table_name: str, **rules) -> dict:
+    """Aturan tabel data mart: NOT NULL dan tipe numerik diturunkan dari skema/DDL BigQuery."""
+    columns = DATA_MART_COLUMNS[table_name]
+    return {
+        "not_null": [name for name, _, mode in columns if mode == "REQUIRED"],
+        "numeric": [name for name, field_type, _ in columns if field_type in _NUMERIC_BIGQUERY_TYPES],
+        **rules,
+    }
+
+
+# Aturan kualitas data per entitas (tabel operasional dan tabel data mart).
+# - not_null : kolom wajib terisi
+# - numeric  : nilai yang terisi harus bisa dibaca sebagai angka
+# - timestamp: nilai yang terisi harus bisa diparsing sebagai waktu ISO 8601
+# - ranges   : {kolom: (min, max)} inklusif, nilai kosong diabaikan
+# - positive : kolom harus > 0
+# - unique   : kunci harus unik; duplikat (selain yang pertama) masuk karantina
+# - dedupe   : kunci digabung (ambil baris valid pertama); duplikat dibuang tanpa karantina,
+#              untuk data yang memang berulang (file staging harian, dimensi dari data fakta)
+VALIDATION_RULES = {
+    # --- Database operasional ---
+    "places": {
+        "not_null": ["place_id"],
+        "numeric": ["lat", "lng", "rating_search"],
+        "ranges": {"lat": (-90, 90), "lng": (-180, 180), "rating_search": (1, 5)},
+        "dedupe": ["place_id"],
+    },
+    "reviews": {
+        "not_null": ["id_review", "timestamp_review"],
+        "numeric": ["rating"],
+        "timestamp": ["timestamp_review"],
+        "ranges": {"rating": (1, 5)},
+        "dedupe": ["id_review"],
+    },
+    "tweets": {
+        "not_null": ["id_tweet", "created_at_tweet"],
+        "numeric": ["tweet_lat", "tweet_lng"],
+        "timestamp": ["created_at_tweet"],
+        "ranges": {"tweet_lat": (-90, 90), "tweet_lng": (-180, 180)},
+        "dedupe": ["id_tweet"],
+    },
+    "pemasukan": {
+        "not_null": ["id_transaksi_original", "timestamp", "jumlah"],
+        "numeric": ["jumlah"],
+        "timestamp": ["timestamp"],
+        "positive": ["jumlah"],
+        "dedupe": ["id_transaksi_original"],
+    },
+    "pengeluaran": {
+        "not_null": ["id_transaksi_original", "timestamp", "jumlah"],
+        "numeric": ["jumlah"],
+        "timestamp": ["timestamp"],
+        "positive": ["jumlah"],
+        "dedupe": ["id_transaksi_original"],
+    },
+    # --- Data mart BigQuery ---
+    "dim_place": _data_mart_rules("dim_place", dedupe=["place_id"]),
+    "dim_user": _data_mart_rules("dim_user", dedupe=["id_user"]),
+    "dim_vendor": _data_mart_rules("dim_vendor", dedupe=["id_vendor"]),
+    "dim_departemen": _data_mart_rules("dim_departemen", dedupe=["id_departemen"]),
+    "dim_proyek": _data_mart_rules("dim_proyek", dedupe=["id_proyek"]),
+    "dim_penyumbang": _data_mart_rules("dim_penyumbang", dedupe=["id_penyumbang"]),
+    "fact_maps": _data_mart_rules("fact_maps", unique=["id_review"], ranges={"rating": (1, 5)}),
+    "fact_twitter": _data_mart_rules("fact_twitter", unique=["id_tweet"]),
+    "fact_pengeluaran": _data_mart_rules(
+        "fact_pengeluaran", unique=["id_transaksi"], positive=["jumlah_pengeluaran"]
+    ),
+    "fact_pemasukan": _data_mart_rules(
+        "fact_pemasukan", unique=["id_transaksi_income"], positive=["jumlah_pemasukan"]
+    ),
+}
+
+
+def _as_numeric(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    return pd.to_numeric(series, errors="coerce")
+
+
+def evaluate_rules(df: pd.DataFrame, entity: str) -> pd.DataFrame:
+    """Mengevaluasi semua aturan entitas dalam satu pass vektor.
+    Mengembalikan DataFrame boolean (satu kolom per aturan, True = pelanggaran)."""
+    spec = VALIDATION_RULES[entity]
+    violations = {}
+    numeric_cache = {}
+
+    def numeric(col):
+        if col not in numeric_cache:
+            numeric_cache[col] = _as_numeric(df[col])
+        return numeric_cache[col]
+
+    for col in spec.get("not_null", []):
+        violations[f"not_null:{col}"] = df[col].isna() if col in df.columns else pd.Series(True, index=df.index)
+    for col in spec.get("numeric", []):
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            violations[f"numeric:{col}"] = numeric(col).isna() & df[col].notna()
+    for col in spec.get("timestamp", []):
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            parsed = pd.to_datetime(df[col], utc=True, errors="coerce", format="ISO8601")
+            violations[f"timestamp:{col}"] = parsed.isna() & df[col].notna()
+    for col, (low, high) in spec.get("ranges", {}).items():
+        if col in df.columns:
+            values = numeric(col)
+            violations[f"range:{col}"] = values.notna() & ~values.between(low, high)
+    for col in spec.get("positive", []):
+        if col in df.columns:
+            values = numeric(col)
+            violations[f"positive:{col}"] = values.notna() & (values <= 0)
+
+    df_violations = pd.DataFrame(violations, index=df.index)
+    # Keunikan dinilai hanya di antara baris yang lolos aturan lain, agar duplikat valid tidak ikut terbuang
+    valid_so_far = ~df_violations.any(axis=1)
+    for rule, key_columns in (("unique", spec.get("unique")), ("dedupe", spec.get("dedupe"))):
+        if key_columns:
+            duplicated = df.loc[valid_so_far, key_columns].duplicated(keep="first")
+            df_violations[f"{rule}:{','.join(key_columns)}"] = duplicated.reindex(df.index, fill_value=False)
+    return df_violations.astype(bool)
+
+
+def validate(df: pd.DataFrame, entity: str):
+    """Validasi DataFrame entitas. Mengembalikan (df_bersih, df_karantina).
+    Baris yang lolos dikembalikan tanpa salinan jika tidak ada pelanggaran; baris yang melanggar
+    (kecuali duplikat 'dedupe') disiapkan untuk tabel karantina beserta alasannya."""
+    empty_quarantine = pd.DataFrame(columns=QUARANTINE_COLUMNS)
+    if df.empty:
+        return df, empty_quarantine
+
+    df_violations = evaluate_rules(df, entity)
+    reject_counts = {rule: int(n) for rule, n in df_violations.sum().items() if n}
+    reject_mask = df_violations.any(axis=1)
+    if not reject_mask.any():
+        return df, empty_quarantine
+
+    quarantine_rules = [rule for rule in df_violations.columns if not rule.startswith("dedupe:")]
+    quarantine_mask = df_violations[quarantine_rules].any(axis=1)
+    rows_rejected = int(quarantine_mask.sum())
+    rows_deduped = int(reject_mask.sum()) - rows_rejected
+    print(json.dumps({"event": "etl_validation", "entity": entity, "rows_in": len(df),
+                      "rows_rejected": rows_rejected, "rows_deduped": rows_deduped,
+                      "reject_counts": reject_counts}))
+    count(rows_rejected=rows_rejected, rows_deduped=rows_deduped,
+          **{f"{REJECT_COUNTER_PREFIX}{entity}:{rule}": n for rule, n in reject_counts.items()})
+
+    df_quarantine = empty_quarantine
+    if quarantine_mask.any():
+        df_rejected_violations = df_violations.loc[quarantine_mask, quarantine_rules]
+        alasan = df_rejected_violations.dot(pd.Index(quarantine_rules) + "; ").str.rstrip("; ")
+        records = df.loc[quarantine_mask].to_json(
+            orient="records", lines=True, date_format="iso", default_handler=str
+        ).splitlines()
+        df_quarantine = pd.DataFrame({
+            "tabel": entity,
+            "alasan": alasan.values,
+            "record": records,
+            "rejected_at": pd.Timestamp(datetime.now(timezone.utc)),
+        })
+    return df.loc[~reject_mask], df_quarantine
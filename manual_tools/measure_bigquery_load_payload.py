@@ -0,0 +1,130 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+import warnings
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Jalankan dari root repo: python manual_tools/measure_bigquery_load_payload.py --rows 200000
+# Membandingkan waktu konversi dan byte unggahan load job data mart cara lama
+# (client.load_table_from_dataframe tanpa skema) dengan jalur Parquet zstd berskema eksplisit
+# (data/bigquery_schema.py). Tidak ada koneksi ke BigQuery: load_table_from_file di-mock untuk
+# mencatat ukuran file yang akan diunggah.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.bigquery_schema import df_to_parquet_buffer, parquet_load_job_config  # noqa: E402
+from data.dim_waktu import waktu_keys  # noqa: E402
+
+TABLE_ID = "proyek.dataset.{table_name}"
+
+
+def synthetic_fact_frames(rows: int, seed: int = 0) -> dict:
+    """DataFrame fakta sintetis dengan dtype seperti hasil transformasi data mart
+    (kategori, string Arrow, Int64 nullable, timestamp ns UTC)."""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.Series(
+        pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta(rng.integers(0, 3.15e10, rows), unit="ms")
+    )
+    string = pd.ArrowDtype(pa.string())
+    place_ids = pd.Categorical(rng.choice([f"ChIJ{i:023d}" for i in range(300)], rows))
+    proyek = pd.Categorical(rng.choice([f"PRJ-{i:03d}" for i in range(40)], rows))
+    return {
+        "fact_maps": pd.DataFrame({
+            "id_review": pd.array([f"{i:032x}" for i in rng.integers(0, 2**62, rows)], dtype=string),
+            "timestamp_datetime": timestamps,
+            "id_waktu": waktu_keys(timestamps),
+            "place_id": place_ids,
+            "author_url": pd.array(
+                [f"https://www.google.com/maps/contrib/{i}" for i in rng.integers(10**17, 10**18, rows)],
+                dtype=string,
+            ),
+            "review_longtext": pd.Categorical(
+                rng.choice(["Tempatnya bagus dan bersih", "Agak ramai saat libur", "Harga tiket terjangkau"], rows)
+            ),
+            "rating": rng.integers(1, 6, rows).astype("float64"),
+        }),
+        "fact_twitter": pd.DataFrame({
+            "id_tweet": pd.array(rng.integers(10**18, 2 * 10**18, rows).astype(str), dtype=string),
+            "created_at_datetime": timestamps,
+            "id_waktu": waktu_keys(timestamps),
+            "place_id": place_ids,
+            "id_user": pd.array(rng.integers(10**9, 10**10, rows).astype(str), dtype=string),
+            "nama_lokasi": pd.Categorical(rng.choice(["Jatim Park", "Batu Night Spectacular", "Coban Rondo"], rows)),
+            "text_tweet": pd.Categorical(rng.choice(["seru banget liburan di sini", "macet parah menuju lokasi"], rows)),
+            "place_id_geo": place_ids,
+            "jarak_place_km": rng.uniform(0, 2, rows),
+        }),
+        "fact_pemasukan": pd.DataFrame({
+            "id_transaksi_income": pd.array([f"IN-{i:09d}" for i in range(rows)], dtype=string),
+            "timestamp_datetime": timestamps,
+            "id_waktu": waktu_keys(timestamps),
+            "jenis_pemasukan": pd.Categorical(rng.choice(["Tiket", "Sponsor", "Hibah"], rows)),
+            "id_penyumbang": pd.Categorical([f"DN-{i:05d}" for i in rng.integers(0, 5000, rows)]),
+            "jumlah_pemasukan": pd.array(rng.integers(10_000, 50_000_000, rows), dtype="Int64"),
+            "bukti_pemasukan": pd.array([f"gs://bukti/{i}.pdf" for i in range(rows)], dtype=string),
+            "id_proyek": proyek,
+        }),
+    }
+
+
+def _offline_client():
+    """Client BigQuery tanpa kredensial; load_table_from_file diganti pencatat ukuran payload."""
+    from google.api_core.exceptions import NotFound
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud import bigquery
+
+    client = bigquery.Client(project="proyek", credentials=AnonymousCredentials())
+    uploads = []
+
+    def capture_upload(file_obj, *args, **kwargs):
+        file_obj.seek(0, os.SEEK_END)
+        uploads.append(file_obj.tell())
+        return mock.Mock()
+
+    client.get_table = mock.Mock(side_effect=NotFound("offline"))
+    client.load_table_from_file = capture_upload
+    return client, uploads
+
+
+def measure_dataframe_path(client, uploads, df: pd.DataFrame, table_name: str):
+    """Cara lama: client mengonversi DataFrame sendiri (inferensi tipe, Parquet snappy)."""
+    from google.cloud import bigquery
+    start = time.perf_counter()
+    client.load_table_from_dataframe(
+        df, TABLE_ID.format(table_name=table_name),
+        job_config=bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE"),
+    )
+    return time.perf_counter() - start, uploads[-1]
+
+
+def measure_parquet_path(client, uploads, df: pd.DataFrame, table_name: str):
+    """Jalur baru: Arrow berskema eksplisit -> Parquet zstd -> load_table_from_file."""
+    start = time.perf_counter()
+    buffer = df_to_parquet_buffer(df, table_name)
+    client.load_table_from_file(
+        buffer, TABLE_ID.format(table_name=table_name),
+        job_config=parquet_load_job_config(table_name, "WRITE_TRUNCATE"),
+    )
+    return time.perf_counter() - start, uploads[-1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mengukur waktu konversi dan byte unggahan load job data mart.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Peringatan inferensi tipe dari load_table_from_dataframe (kolom kategori) tidak relevan untuk pengukuran
+    warnings.filterwarnings("ignore", module="google.cloud.bigquery")
+    client, uploads = _offline_client()
+    print(f"pandas {pd.__version__}, {args.rows} baris per tabel, median {args.repeat} run")
+    print(f"{'tabel':<16} {'jalur':<22} {'konversi (ms)':>14} {'unggahan (MiB)':>15}")
+    for table_name, df in synthetic_fact_frames(args.rows).items():
+        for label, measure in (("load_table_from_df", measure_dataframe_path), ("parquet zstd", measure_parquet_path)):
+            runs = [measure(client, uploads, df, table_name) for _ in range(args.repeat)]
+            elapsed_ms = statistics.median(run[0] for run in runs) * 1000
+            print(f"{table_name:<16} {label:<22} {elapsed_ms:>14.0f} {runs[-1][1] / 1024 / 1024:>15.2f}")
@@ -0,0 +1,90 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Jalankan dari root repo:
+#   python manual_tools/measure_dag_import_time.py --baseline-ref <commit>
+# Tree saat ini dibandingkan dengan tree hasil `git archive <commit>`, dengan pernyataan impor
+# yang sama, sehingga angka "sebelum" benar-benar berasal dari kode lama.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# File DAG saja (yang dilakukan scheduler setiap parsing) dan impor langsung modul ETL.
+TARGETS = {
+    "dag": "import tourism_finance_etl_dag",
+    "modul ETL": "import data.extraction, data.transformation_db, data.transformation_dw",
+}
+
+
+def export_tree(ref: str, destination: str) -> str:
+    """Menyalin isi commit `ref` ke direktori sementara (tanpa mengubah working tree)."""
+    archive = subprocess.run(["git", "-C", REPO_ROOT, "archive", ref], capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", destination], input=archive.stdout, check=True)
+    return destination
+
+
+def run_importtime(tree: str, statement: str):
+    """Satu kali impor di interpreter baru (tanpa cache modul) dengan -X importtime.
+    Mengembalikan (durasi proses, {paket top-level: kumulatif us}, error terakhir atau None)."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([tree, os.path.join(tree, "dags"), env.get("PYTHONPATH", "")])
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=tree, env=env, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    # Baris importtime: "import time: self [us] | cumulative | imported package"
+    top_level = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, package = line[len("import time:"):].split("|")
+        # Impor bersarang diindentasi lebih dari satu spasi setelah '|'
+        if not package.startswith("  "):
+            top_level[package.strip()] = int(cumulative)
+
+    error = None
+    if result.returncode != 0:
+        error = (result.stderr.strip().splitlines() or ["?"])[-1]
+    return elapsed, top_level, error
+
+
+def measure_import(tree: str, statement: str, repeat: int = 5, top_n: int = 10):
+    """Mengukur impor `repeat` kali dan mencetak median waktu proses serta impor top-level terberat."""
+    runs = [run_importtime(tree, statement) for _ in range(repeat)]
+    elapsed = statistics.median(run[0] for run in runs)
+    packages = set().union(*(run[1] for run in runs))
+    cumulative = {
+        package: statistics.median(run[1].get(package, 0) for run in runs) for package in packages
+    }
+    error = runs[-1][2]
+
+    print(f"  Median waktu proses (termasuk start interpreter, {repeat} run): {elapsed:.3f} s")
+    print(f"  Total impor top-level (median): {sum(cumulative.values()) / 1000:.1f} ms")
+    if error:
+        # Impor yang terjadi sebelum error tetap terukur (misal DAG lama gagal setelah impor modul)
+        print(f"  PERINGATAN: impor berakhir dengan error: {error}")
+    print(f"  Top {top_n} impor top-level (kumulatif):")
+    for package, cumulative_us in sorted(cumulative.items(), key=lambda item: -item[1])[:top_n]:
+        print(f"    {cumulative_us / 1000:9.1f} ms  {package}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mengukur waktu impor DAG dan modul ETL.")
+    parser.add_argument("--baseline-ref", help="Commit pembanding (misal baseline sebelum lazy import)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as baseline_dir:
+        trees = {"saat ini": REPO_ROOT}
+        if args.baseline_ref:
+            trees[f"baseline {args.baseline_ref}"] = export_tree(args.baseline_ref, baseline_dir)
+        for tree_label, tree in trees.items():
+            for label, statement in TARGETS.items():
+                print(f"\n=== [{tree_label}] {label}: {statement} ===")
+                measure_import(tree, statement, repeat=args.repeat)
@@ -0,0 +1,75 @@
+import argparse
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Jalankan dari root repo: python manual_tools/measure_dtype_memory.py --rows 200000
+# Membandingkan memori DataFrame hasil pembacaan CSV staging cara lama (pd.read_csv tanpa dtype)
+# dengan rencana dtype (data/dtypes.py) pada data sintetis yang bentuknya mirip data staging.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.dtypes import apply_dtype_plan, csv_read_dtypes  # noqa: E402
+
+
+def synthetic_staging_frames(rows: int, seed: int = 0) -> dict:
+    """DataFrame sintetis per entitas: kardinalitas kolom berulang dibuat mirip data sebenarnya."""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta(rng.integers(0, 3.15e7, rows), unit="s")
+    place_ids = np.array([f"ChIJ{i:023d}" for i in range(300)])
+    proyek = np.array([f"PRJ-{i:03d}" for i in range(40)])
+    return {
+        "reviews": pd.DataFrame({
+            "id_review": [f"{i:032x}" for i in rng.integers(0, 2**62, rows)],
+            "timestamp_review": timestamps.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+            "place_id": rng.choice(place_ids, rows),
+            "author_url": [f"https://www.google.com/maps/contrib/{i}" for i in rng.integers(10**17, 10**18, rows)],
+            "review_text": rng.choice(["Tempatnya bagus dan bersih", "Agak ramai saat libur", "Harga tiket terjangkau"], rows),
+            "rating": rng.integers(1, 6, rows),
+        }),
+        "tweets": pd.DataFrame({
+            "id_tweet": rng.integers(10**18, 2 * 10**18, rows).astype(str),
+            "place_id_source": rng.choice(place_ids, rows),
+            "keyword_search": rng.choice(["Jatim Park", "Batu Night Spectacular", "Coban Rondo"], rows),
+            "created_at_tweet": timestamps.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+            "text_tweet": rng.choice(["seru banget liburan di sini", "macet parah menuju lokasi"], rows),
+            "id_author_twitter": rng.integers(10**9, 10**10, rows).astype(str),
+            "author_location": rng.choice(["Malang", "Surabaya", "Jakarta", None], rows),
+            "tweet_lat": rng.uniform(-8.1, -7.8, rows),
+            "tweet_lng": rng.uniform(112.5, 112.8, rows),
+        }),
+        "pemasukan": pd.DataFrame({
+            "id_transaksi_original": [f"IN-{i:09d}" for i in range(rows)],
+            "timestamp": timestamps.strftime("%Y-%m-%d %H:%M:%S"),
+            "id_proyek": rng.choice(proyek, rows),
+            "nama_proyek": rng.choice(proyek, rows),
+            "sektor_pariwisata": rng.choice(["Alam", "Buatan", "Budaya", "Kuliner"], rows),
+            "id_penyumbang": [f"DN-{i:05d}" for i in rng.integers(0, 5000, rows)],
+            "nama_penyumbang": rng.choice(["PT Maju", "CV Sejahtera", "Dinas Pariwisata"], rows),
+            "jenis_penyumbang": rng.choice(["Swasta", "Pemerintah", "Perorangan"], rows),
+            "jenis_pemasukan": rng.choice(["Tiket", "Sponsor", "Hibah"], rows),
+            "jumlah": rng.integers(10_000, 50_000_000, rows),
+            "bukti": [f"gs://bukti/{i}.pdf" for i in range(rows)],
+        }),
+    }
+
+
+def deep_mib(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mengukur memori DataFrame sebelum/sesudah rencana dtype.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    # Di pandas >= 3 read_csv sudah memakai string Arrow secara default, jadi selisihnya lebih kecil
+    print(f"pandas {pd.__version__}, {args.rows} baris per entitas")
+    print(f"{'entitas':<12} {'lama (MiB)':>12} {'rencana dtype (MiB)':>20} {'rasio':>7}")
+    for entity, df in synthetic_staging_frames(args.rows).items():
+        csv_text = df.to_csv(index=False)
+        df_old = pd.read_csv(io.StringIO(csv_text))
+        df_new = apply_dtype_plan(pd.read_csv(io.StringIO(csv_text), dtype=csv_read_dtypes(entity)), entity)
+        old_mib, new_mib = deep_mib(df_old), deep_mib(df_new)
+        print(f"{entity:<12} {old_mib:>12.1f} {new_mib:>20.1f} {old_mib / new_mib:>6.1f}x")